@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Author, Post, Comment
+from .models import ArchivedPost, Author, Post, Comment
 
 
 # Register your models here.
@@ -22,3 +22,21 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ("post", "user", "created")
     list_filter = ("created",)
     search_fields = ("content",)
+
+
+@admin.register(ArchivedPost)
+class ArchivedPostAdmin(admin.ModelAdmin):
+    list_display = ("id", "title", "author", "published_date", "active", "archived_at")
+    list_filter = ("active", "archived_at")
+    search_fields = ("title",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    # Archived posts stay counted in the histogram and author statistics,
+    # which no signal would update on delete.
+    def has_delete_permission(self, request, obj=None):
+        return False
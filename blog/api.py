@@ -1,5 +1,6 @@
 from rest_framework import status
 from rest_framework.views import APIView
+from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from blog.serializers import (
@@ -7,8 +8,19 @@ from blog.serializers import (
     PostCreateSerializer,
     PostMinimalSerializer,
     CommentSerializer,
+    AuthorStatsSerializer,
 )
-from blog.models import Author, Post, Comment
+from blog.models import ArchivedPost, Post, Comment
+from blog.archive import get_archived_post, get_posts, resolve_rows, with_archived
+from blog.idempotency import idempotent
+from blog.pagination import PostPagination
+from blog import author_stats, authors, detail_cache, live, rollups
+from django.conf import settings
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.utils.http import parse_etags
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.permissions import (
@@ -17,6 +29,44 @@ from rest_framework.permissions import (
     IsAuthenticated,
 )
 
+IDEMPOTENCY_KEY_PARAMETER = openapi.Parameter(
+    "Idempotency-Key",
+    openapi.IN_HEADER,
+    description="Unique key per logical request; retries with the same key "
+    "get the first response back instead of creating again",
+    type=openapi.TYPE_STRING,
+    required=False,
+)
+
+
+def post_etag(post):
+    return f'"{post.revision}"'
+
+
+def parse_if_match(request):
+    """
+    The post revisions an ``If-Match`` header accepts, or None when the
+    request is unconditional (no header, or ``*``).
+    """
+    header = request.headers.get("If-Match")
+    if not header:
+        return None
+    etags = parse_etags(header)
+    if "*" in etags:
+        return None
+    # Weak ETags never match If-Match, and are not numbers once unquoted.
+    return {int(etag.strip('"')) for etag in etags if etag.strip('"').isdigit()}
+
+
+def precondition_failed(current=None):
+    response = Response(
+        {"error": "The post has been modified since it was read."},
+        status=status.HTTP_412_PRECONDITION_FAILED,
+    )
+    if current is not None:
+        response["ETag"] = post_etag(current)
+    return response
+
 
 class PostViewSet(ModelViewSet):
     """
@@ -26,6 +76,7 @@ class PostViewSet(ModelViewSet):
     queryset = Post.objects.all().order_by("-published_date")
     serializer_class = PostMinimalSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = PostPagination
 
     @swagger_auto_schema(
         operation_summary="List all posts",
@@ -103,31 +154,44 @@ class PostViewSet(ModelViewSet):
             is_active = active_param == "true"
         else:
             is_active = True
-        self.queryset = self.queryset.filter(active=is_active)
-        title_param = request.query_params.get("title")
+        self.queryset = self.filter_posts(self.queryset.filter(active=is_active))
+        if page_size:
+            self.paginator.page_size = int(page_size)
+        if not is_active:
+            return self.list_with_archived()
+        return super().list(request, *args, **kwargs)
+
+    def filter_posts(self, queryset):
+        """
+        Apply the title, content, author and date filters of the request.
+        """
+        title_param = self.request.query_params.get("title")
         if title_param:
-            self.queryset = self.queryset.filter(title__icontains=title_param)
-        content_param = request.query_params.get("content")
+            queryset = queryset.filter(title__icontains=title_param)
+        content_param = self.request.query_params.get("content")
         if content_param:
-            self.queryset = self.queryset.filter(content__icontains=content_param)
-        author_name_param = request.query_params.get("author_name")
+            queryset = queryset.filter(content__icontains=content_param)
+        author_name_param = self.request.query_params.get("author_name")
         if author_name_param:
-            self.queryset = self.queryset.filter(
-                author__name__icontains=author_name_param
-            )
-        published_date_start = request.query_params.get("published_date_start")
-        published_date_end = request.query_params.get("published_date_end")
+            queryset = queryset.filter(author__name__icontains=author_name_param)
+        published_date_start = self.request.query_params.get("published_date_start")
+        published_date_end = self.request.query_params.get("published_date_end")
 
         if published_date_end:
             published_date_end = self.to_datetime(published_date_end)
-            self.queryset = self.queryset.filter(published_date__lte=published_date_end)
+            queryset = queryset.filter(published_date__lte=published_date_end)
         if published_date_start:
-            self.queryset = self.queryset.filter(
-                published_date__gte=published_date_start
-            )
-        if page_size:
-            self.paginator.page_size = int(page_size)
-        return super().list(request, *args, **kwargs)
+            queryset = queryset.filter(published_date__gte=published_date_start)
+        return queryset
+
+    def list_with_archived(self):
+        """
+        List inactive posts from both the live and the archive tables.
+        """
+        archived = self.filter_posts(ArchivedPost.objects.filter(active=False))
+        page = self.paginate_queryset(with_archived(self.queryset, archived))
+        serializer = self.get_serializer(resolve_rows(page), many=True)
+        return self.get_paginated_response(serializer.data)
 
     def to_datetime(self, date_str):
         """
@@ -155,11 +219,180 @@ class PostViewSet(ModelViewSet):
     )
     def retrieve(self, request, *args, **kwargs):
         """
-        Retrieve a single post by ID.
+        Retrieve a single post by ID, falling back to the archive.
         """
-        instance = self.get_object()
-        serializer = PostWithCommentsSerializer(instance, context={"request": request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        post_id = kwargs.get("pk")
+        if not str(post_id).isdigit():
+            raise Http404
+        detail = detail_cache.get_detail(int(post_id), self.render_detail)
+        if detail is None:
+            raise Http404
+        response = Response(detail["data"], status=status.HTTP_200_OK)
+        if detail["etag"]:
+            response["ETag"] = detail["etag"]
+        return response
+
+    def render_detail(self):
+        """
+        The serialized post with its comments and its ETag, or None.
+        """
+        try:
+            instance = self.get_object()
+        except Http404:
+            instance = get_archived_post(self.kwargs.get("pk"))
+            if instance is None:
+                return None
+        serializer = PostWithCommentsSerializer(
+            instance, context={"request": self.request}
+        )
+        return {
+            "data": serializer.data,
+            "etag": post_etag(instance) if isinstance(instance, Post) else None,
+        }
+
+    @swagger_auto_schema(
+        operation_summary="Post counts by publication date",
+        operation_description="Number of posts published per day, month or year, "
+        "read from counters maintained on every post write.",
+        responses={
+            200: openapi.Response("Counts per bucket, oldest first"),
+            400: "Bad request.",
+        },
+        tags=["Posts"],
+        manual_parameters=[
+            openapi.Parameter(
+                "period",
+                openapi.IN_QUERY,
+                description="Bucket size (default month)",
+                type=openapi.TYPE_STRING,
+                enum=["day", "month", "year"],
+                required=False,
+            ),
+            openapi.Parameter(
+                "status",
+                openapi.IN_QUERY,
+                description="Only count posts with this status (draft/published)",
+                type=openapi.TYPE_STRING,
+                enum=["draft", "published"],
+                required=False,
+            ),
+            openapi.Parameter(
+                "active",
+                openapi.IN_QUERY,
+                description="Count active (default) or inactive posts",
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+            ),
+        ],
+    )
+    @action(detail=False, methods=["get"], permission_classes=[AllowAny])
+    def histogram(self, request):
+        """
+        Post counts per publication date bucket.
+        """
+        period = request.query_params.get("period", "month")
+        if period not in rollups.PERIODS:
+            return Response(
+                {"error": f"period must be one of {', '.join(rollups.PERIODS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        buckets = rollups.histogram(
+            period,
+            status=request.query_params.get("status"),
+            active=request.query_params.get("active", "true") == "true",
+        )
+        return Response(
+            {"period": period, "buckets": buckets}, status=status.HTTP_200_OK
+        )
+
+    @swagger_auto_schema(
+        method="get",
+        operation_summary="Retrieve several posts by ID",
+        operation_description="Posts in the requested order, live or archived, "
+        "with the ids that were not found.",
+        responses={200: "Posts and missing ids.", 400: "Bad request."},
+        tags=["Posts"],
+        manual_parameters=[
+            openapi.Parameter(
+                "ids",
+                openapi.IN_QUERY,
+                description="Comma-separated post ids. Example: 3,1,2",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+            openapi.Parameter(
+                "comments",
+                openapi.IN_QUERY,
+                description="Include up to this many comments per post (default 0)",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+        ],
+    )
+    @swagger_auto_schema(
+        method="post",
+        operation_summary="Retrieve several posts by ID",
+        operation_description="Same as GET, for id lists too long for a URL.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=["ids"],
+            properties={
+                "ids": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                ),
+                "comments": openapi.Schema(type=openapi.TYPE_INTEGER),
+            },
+        ),
+        responses={200: "Posts and missing ids.", 400: "Bad request."},
+        tags=["Posts"],
+    )
+    @action(detail=False, methods=["get", "post"], permission_classes=[AllowAny])
+    def batch(self, request):
+        """
+        Several posts by ID in one request, in the order asked for.
+        """
+        config = settings.POST_BATCH
+        if request.method == "POST":
+            data = request.data if isinstance(request.data, dict) else {}
+            ids, comments = data.get("ids"), data.get("comments", 0)
+            if not isinstance(ids, list):
+                return Response(
+                    {"error": "ids must be a list of post ids."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        else:
+            ids = request.query_params.get("ids", "").split(",")
+            comments = request.query_params.get("comments", 0)
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in ids or []))
+            comments = int(comments)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "ids must be post ids and comments a number."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not ids or len(ids) > config["MAX_IDS"]:
+            return Response(
+                {"error": f"Between 1 and {config['MAX_IDS']} ids are required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        comments = max(0, min(comments, config["MAX_COMMENTS"]))
+        posts = get_posts(ids, comments)
+        serializer_class = (
+            PostWithCommentsSerializer if comments else PostMinimalSerializer
+        )
+        return Response(
+            {
+                "results": serializer_class(
+                    [posts[pk] for pk in ids if pk in posts],
+                    many=True,
+                    context={"request": request},
+                ).data,
+                "missing": [pk for pk in ids if pk not in posts],
+            },
+            status=status.HTTP_200_OK,
+        )
 
     @swagger_auto_schema(
         operation_summary="Create a new post",
@@ -168,10 +401,15 @@ class PostViewSet(ModelViewSet):
         responses={
             201: PostMinimalSerializer,
             400: "Bad request.",
+            409: "A request with the same Idempotency-Key is in progress.",
+            422: "The Idempotency-Key was used for a different request.",
             500: "Internal server error.",
         },
         tags=["Posts"],
+        manual_parameters=[IDEMPOTENCY_KEY_PARAMETER],
     )
+    @idempotent
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         """
         Create a new post.
@@ -179,13 +417,12 @@ class PostViewSet(ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        author = Author.objects.filter(user=request.user).first()
-        if not author:
-            new_author = Author.objects.create(
-                name=request.user.username, email=request.user.email, user=request.user
-            )
-        serializer.save(author=author or new_author)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        serializer.save(author=authors.get_author(request.user))
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED,
+            headers={"ETag": post_etag(serializer.instance)},
+        )
 
     @swagger_auto_schema(
         operation_summary="Update an existing post",
@@ -195,21 +432,35 @@ class PostViewSet(ModelViewSet):
             200: PostMinimalSerializer,
             400: "Bad request.",
             404: "Not found.",
+            412: "The If-Match revision is out of date.",
             500: "Internal server error.",
         },
         tags=["Posts"],
     )
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         """
-        Update an existing post.
+        Update an existing post. An ``If-Match`` header makes the update
+        conditional on the post's revision.
         """
         instance = self.get_object()
+        revisions = parse_if_match(request)
+        if revisions is not None and instance.revision not in revisions:
+            return precondition_failed(instance)
         serializer = PostCreateSerializer(
             instance, data=request.data, context={"request": request}
         )
         serializer.is_valid(raise_exception=True)
+        if not instance.bump_revision(instance.revision):
+            # Changed since get_object(); only conditional requests mind.
+            if revisions is not None or not instance.bump_revision():
+                return precondition_failed()
         self.perform_update(serializer)
-        return Response(PostMinimalSerializer(instance).data, status=status.HTTP_200_OK)
+        return Response(
+            PostMinimalSerializer(instance).data,
+            status=status.HTTP_200_OK,
+            headers={"ETag": post_etag(instance)},
+        )
 
     @swagger_auto_schema(
         operation_summary="Partially update a post",
@@ -219,10 +470,12 @@ class PostViewSet(ModelViewSet):
             200: PostMinimalSerializer,
             400: "Bad request.",
             404: "Not found.",
+            412: "The If-Match revision is out of date.",
             500: "Internal server error.",
         },
         tags=["Posts"],
     )
+    @transaction.atomic
     def partial_update(self, request, *args, **kwargs):
         return super().partial_update(request, *args, **kwargs)
 
@@ -232,15 +485,23 @@ class PostViewSet(ModelViewSet):
         responses={
             204: "No content.",
             404: "Not found.",
+            412: "The If-Match revision is out of date.",
             500: "Internal server error.",
         },
         tags=["Posts"],
     )
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         """
-        Delete a post.
+        Delete a post, conditionally on its revision with ``If-Match``.
         """
         instance = self.get_object()
+        revisions = parse_if_match(request)
+        if revisions is not None:
+            if instance.revision not in revisions:
+                return precondition_failed(instance)
+            if not instance.bump_revision(instance.revision):
+                return precondition_failed()
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -268,10 +529,15 @@ class AddCommentAPIView(APIView):
             201: openapi.Response("Comment created successfully"),
             400: "Bad request.",
             404: "Post not found.",
+            409: "A request with the same Idempotency-Key is in progress.",
+            422: "The Idempotency-Key was used for a different request.",
             500: "Internal server error.",
         },
         tags=["Comments"],
+        manual_parameters=[IDEMPOTENCY_KEY_PARAMETER],
     )
+    @idempotent
+    @transaction.atomic
     def post(self, request, **kwargs):
         """
         Add a comment to a post.
@@ -323,6 +589,7 @@ class RemoveCommentAPIView(APIView):
         },
         tags=["Comments"],
     )
+    @transaction.atomic
     def delete(self, request, **kwargs):
         """
         Remove a comment from a post.
@@ -355,3 +622,68 @@ class RemoveCommentAPIView(APIView):
         if comment.user == self.request.user or post.author.user == self.request.user:
             return True
         return False
+
+
+class AuthorStatsAPIView(APIView):
+    """
+    A view to read the statistics of an author.
+    """
+
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_summary="Get author statistics",
+        operation_description="Post counts by status, comments received and "
+        "latest publication date of an author.",
+        responses={
+            200: AuthorStatsSerializer,
+            404: "Author not found.",
+        },
+        tags=["Authors"],
+    )
+    def get(self, request, **kwargs):
+        """
+        Get the statistics of an author.
+        """
+        stats = author_stats.get_author_stats(kwargs.get("author_id"))
+        if stats is None:
+            return Response(
+                {"error": "Author not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(stats, status=status.HTTP_200_OK)
+
+
+class CommentStreamView(View):
+    """
+    Server-Sent Events of new comments on a post, for ``EventSource``.
+    Resumes after the ``Last-Event-ID`` header or ``last_event_id`` query
+    parameter when given.
+    """
+
+    async def get(self, request, post_id):
+        if not await Post.objects.filter(pk=post_id).aexists():
+            return JsonResponse({"error": "Post not found."}, status=404)
+        last_event_id = request.headers.get(
+            "Last-Event-ID", request.GET.get("last_event_id")
+        )
+        last_event_id = int(last_event_id) if (last_event_id or "").isdigit() else None
+
+        if isinstance(request, ASGIRequest):
+            events = live.event_stream(post_id, last_event_id)
+        else:
+            # A WSGI worker cannot hold the connection open: send what is
+            # missed and let the client reconnect after the retry delay.
+            retry = f"retry: {settings.COMMENT_STREAM['RETRY_MS']}\n"
+            if last_event_id is None:
+                # A new viewer has the page already; only set where its
+                # reconnect resumes from.
+                events = [f"{retry}id: {await live.latest_id(post_id)}\n\n"]
+            else:
+                messages = await live.backlog(post_id, last_event_id)
+                events = [retry + "\n"]
+                events += [live.format_event(message) for message in messages]
+        return StreamingHttpResponse(
+            events,
+            content_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
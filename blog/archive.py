@@ -0,0 +1,162 @@
+"""
+Hot/cold archival of posts.
+
+Inactive posts and posts older than ``ARCHIVE["MAX_AGE_DAYS"]`` are moved,
+with their comments, from ``Post``/``Comment`` into ``ArchivedPost``/
+``ArchivedComment`` so the live tables and their indexes only hold the
+working set. Reads that may hit archived posts go through the helpers here.
+Archived posts are still served, so the signal handlers check ``archiving``
+to tell the deletes of an archival apart from real ones.
+"""
+
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Q, Value
+from django.utils import timezone
+
+from blog.models import ArchivedComment, ArchivedPost, Comment, Post
+
+POST_FIELDS = [
+    "id",
+    "title",
+    "content",
+    "published_date",
+    "author_id",
+    "status",
+    "active",
+]
+COMMENT_FIELDS = ["id", "post_id", "content", "user_id", "created"]
+
+_archiving = ContextVar("archiving", default=False)
+
+
+def archiving():
+    """
+    Whether the current deletes move posts to the archive.
+    """
+    return _archiving.get()
+
+
+def archivable_posts(max_age_days=None):
+    """
+    Posts due for archival: inactive ones, plus those older than
+    ``max_age_days`` when it is set.
+    """
+    condition = Q(active=False)
+    if max_age_days:
+        cutoff = timezone.now() - timezone.timedelta(days=max_age_days)
+        condition |= Q(published_date__lt=cutoff)
+    return Post.objects.filter(condition)
+
+
+def archive_batch(post_ids):
+    """
+    Move the given posts and their comments to the archive tables in one
+    transaction. Returns the number of posts moved.
+    """
+    with transaction.atomic():
+        posts = list(
+            Post.objects.select_for_update()
+            .filter(id__in=post_ids)
+            .values(*POST_FIELDS)
+        )
+        if not posts:
+            return 0
+        ids = [post["id"] for post in posts]
+        ArchivedPost.objects.bulk_create(ArchivedPost(**post) for post in posts)
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(**comment)
+            for comment in Comment.objects.filter(post_id__in=ids).values(
+                *COMMENT_FIELDS
+            )
+        )
+        token = _archiving.set(True)
+        try:
+            Post.objects.filter(id__in=ids).delete()
+        finally:
+            _archiving.reset(token)
+    return len(posts)
+
+
+def archive_posts(max_age_days=None, batch_size=None):
+    """
+    Archive every archivable post in batches of ``batch_size``, so each
+    transaction and its locks stay short. Returns the number of posts moved.
+    """
+    batch_size = batch_size or settings.ARCHIVE["BATCH_SIZE"]
+    queryset = archivable_posts(max_age_days).order_by("id")
+    moved = 0
+    while True:
+        ids = list(queryset.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return moved
+        moved += archive_batch(ids)
+
+
+def get_archived_post(pk):
+    """
+    Return the archived post with this id, or None.
+    """
+    try:
+        return ArchivedPost.objects.select_related("author").get(pk=pk)
+    except (ArchivedPost.DoesNotExist, ValueError):
+        return None
+
+
+def get_posts(ids, comments=0):
+    """
+    Return ``{id: post}`` for the live or archived posts among ``ids``, with
+    the first ``comments`` comments of each in ``first_comments`` when
+    non-zero. Costs
+    at most four queries however many ids are given.
+    """
+    found = {}
+    for model, comment_model in (
+        (Post, Comment),
+        (ArchivedPost, ArchivedComment),
+    ):
+        wanted = [pk for pk in ids if pk not in found]
+        if not wanted:
+            break
+        queryset = model.objects.select_related("author")
+        if comments:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "comments",
+                    queryset=comment_model.objects.select_related("user").order_by(
+                        "id"
+                    )[:comments],
+                    to_attr="first_comments",
+                )
+            )
+        found.update(queryset.in_bulk(wanted))
+    return found
+
+
+def with_archived(hot_queryset, archived_queryset):
+    """
+    Union of hot and archived post rows as ``(id, published_date, archived)``
+    ordered newest first, suitable for pagination.
+    """
+    hot = hot_queryset.annotate(archived=Value(False)).values_list(
+        "id", "published_date", "archived"
+    )
+    cold = archived_queryset.annotate(archived=Value(True)).values_list(
+        "id", "published_date", "archived"
+    )
+    return hot.order_by().union(cold.order_by(), all=True).order_by("-published_date")
+
+
+def resolve_rows(rows):
+    """
+    Load the posts behind a page of ``with_archived`` rows, keeping order.
+    """
+    hot = Post.objects.select_related("author").in_bulk(
+        [pk for pk, _, archived in rows if not archived]
+    )
+    cold = ArchivedPost.objects.select_related("author").in_bulk(
+        [pk for pk, _, archived in rows if archived]
+    )
+    return [(cold if archived else hot)[pk] for pk, _, archived in rows]
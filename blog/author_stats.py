@@ -0,0 +1,189 @@
+"""
+Per-author statistics.
+
+``AuthorStats`` keeps one row per author with post counts by status, the
+number of comments on their posts and their latest publication date. The
+signal handlers in ``blog.signals`` apply each post or comment write to the
+row inside the write's transaction, so a profile view is one primary-key
+lookup, itself cached for ``AUTHOR_STATS["CACHE_TTL"]`` seconds. Archived
+posts and their comments stay counted.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from blog.models import (
+    ArchivedComment,
+    ArchivedPost,
+    Author,
+    AuthorStats,
+    Comment,
+    Post,
+)
+from blog.serializers import AuthorStatsSerializer
+from server.metrics import record_cache_lookup
+
+STATUS_FIELDS = {"draft": "draft_posts", "published": "published_posts"}
+FIELDS = [
+    "draft_posts",
+    "published_posts",
+    "comments_received",
+    "latest_published_date",
+]
+
+
+def cache_key(author_id):
+    return f"author-stats:{author_id}"
+
+
+def invalidate(*author_ids):
+    keys = [cache_key(author_id) for author_id in author_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def adjust(author_id, **deltas):
+    AuthorStats.objects.filter(author_id=author_id).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items() if delta},
+    )
+
+
+def refresh_latest(author_id):
+    dates = [
+        model.objects.filter(author_id=author_id).aggregate(
+            latest=Max("published_date")
+        )["latest"]
+        for model in (Post, ArchivedPost)
+    ]
+    latest = max((date for date in dates if date is not None), default=None)
+    AuthorStats.objects.filter(author_id=author_id).update(
+        latest_published_date=latest, updated_at=timezone.now()
+    )
+
+
+def status_delta(status, delta):
+    field = STATUS_FIELDS.get(status)
+    return {field: delta} if field else {}
+
+
+def record_post_change(old, new):
+    """
+    Apply a post write to the stats rows. ``old`` is the post as stored
+    before the write and ``new`` as saved; either may be None.
+    """
+    old_key = (old.author_id, old.status) if old is not None else None
+    new_key = (new.author_id, new.status) if new is not None else None
+    with transaction.atomic():
+        if old_key != new_key:
+            if old is not None:
+                adjust(old.author_id, **status_delta(old.status, -1))
+            if new is not None:
+                adjust(new.author_id, **status_delta(new.status, 1))
+        if old is not None and new is not None and old.author_id != new.author_id:
+            comments = Comment.objects.filter(post_id=new.pk).count()
+            adjust(old.author_id, comments_received=-comments)
+            adjust(new.author_id, comments_received=comments)
+        if new is not None:
+            AuthorStats.objects.filter(
+                Q(latest_published_date__lt=new.published_date)
+                | Q(latest_published_date__isnull=True),
+                author_id=new.author_id,
+            ).update(latest_published_date=new.published_date)
+        if old is not None and (new is None or old.author_id != new.author_id):
+            refresh_latest(old.author_id)
+        elif old is not None and old.published_date > new.published_date:
+            refresh_latest(old.author_id)
+    invalidate(*{post.author_id for post in (old, new) if post is not None})
+
+
+def record_comment_change(comment, delta):
+    author_id = (
+        Post.objects.filter(pk=comment.post_id)
+        .values_list("author_id", flat=True)
+        .first()
+    )
+    if author_id is not None:
+        adjust(author_id, comments_received=delta)
+        invalidate(author_id)
+
+
+def rebuild(author_ids):
+    """
+    Recompute the stats rows of the given authors from live and archived
+    posts and comments. Returns the number of rows written.
+    """
+    rows = {
+        author_id: AuthorStats(author_id=author_id, updated_at=timezone.now())
+        for author_id in author_ids
+    }
+    for post_model, comment_model in (
+        (Post, Comment),
+        (ArchivedPost, ArchivedComment),
+    ):
+        posts = (
+            post_model.objects.filter(author_id__in=rows)
+            .values("author_id", "status")
+            .annotate(count=Count("id"), latest=Max("published_date"))
+            .order_by()
+        )
+        for group in posts:
+            row = rows[group["author_id"]]
+            for field, count in status_delta(group["status"], group["count"]).items():
+                setattr(row, field, getattr(row, field) + count)
+            if row.latest_published_date is None or group["latest"] > (
+                row.latest_published_date
+            ):
+                row.latest_published_date = group["latest"]
+        comments = (
+            comment_model.objects.filter(post__author_id__in=rows)
+            .values("post__author_id")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        for group in comments:
+            rows[group["post__author_id"]].comments_received += group["count"]
+    AuthorStats.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=["author"],
+        update_fields=FIELDS + ["updated_at"],
+    )
+    invalidate(*rows)
+    return len(rows)
+
+
+def rebuild_all(batch_size=500):
+    """
+    Rebuild the stats of every author, ``batch_size`` authors at a time.
+    """
+    author_ids = list(Author.objects.order_by("id").values_list("id", flat=True))
+    written = 0
+    for start in range(0, len(author_ids), batch_size):
+        with transaction.atomic():
+            written += rebuild(author_ids[start : start + batch_size])
+    return written
+
+
+def get_author_stats(author_id):
+    """
+    Return the serialized stats of an author, or None for an unknown author.
+    """
+    key = cache_key(author_id)
+    data = cache.get(key)
+    record_cache_lookup("author_stats", data is not None)
+    if data is not None:
+        return data
+    stats = AuthorStats.objects.filter(author_id=author_id).first()
+    if stats is None:
+        if not Author.objects.filter(pk=author_id).exists():
+            return None
+        # Authors created before the stats table existed.
+        with transaction.atomic():
+            rebuild([author_id])
+        stats = AuthorStats.objects.get(author_id=author_id)
+    data = AuthorStatsSerializer(stats).data
+    cache.set(key, data, settings.AUTHOR_STATS["CACHE_TTL"])
+    return data
@@ -0,0 +1,46 @@
+"""
+Resolve the author behind a user for writes.
+
+``Author.user`` is unique, so a user's first post creates their author with
+``get_or_create`` and concurrent first posts settle on the same row. The
+author's fields are then cached under ``author:<user id>`` for
+``AUTHOR_CACHE["TTL"]`` seconds, so later creates skip the lookup; the
+two-tier cache serves hot authors from worker memory. Author saves and
+deletes drop the entry once they commit, in every worker.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from blog.models import Author
+from server.metrics import record_cache_lookup
+
+FIELDS = ["id", "name", "email", "user_id"]
+
+
+def cache_key(user_id):
+    return f"author:{user_id}"
+
+
+def get_author(user):
+    """
+    Return the author of ``user``, creating it on their first write.
+    """
+    key = cache_key(user.pk)
+    values = cache.get(key)
+    record_cache_lookup("author", values is not None)
+    if values is not None:
+        return Author.from_db(DEFAULT_DB_ALIAS, FIELDS, values)
+
+    author, _ = Author.objects.get_or_create(
+        user=user, defaults={"name": user.username, "email": user.email}
+    )
+    values = [getattr(author, field) for field in FIELDS]
+    # Not before commit: a rolled back create must not be remembered.
+    transaction.on_commit(lambda: cache.set(key, values, settings.AUTHOR_CACHE["TTL"]))
+    return author
+
+
+def evict(user_id):
+    transaction.on_commit(lambda: cache.delete(cache_key(user_id)))
@@ -0,0 +1,164 @@
+"""
+Read-through cache of rendered post details.
+
+``retrieve`` serves the ``PostWithCommentsSerializer`` output of a post from
+the cache under ``post-detail:<id>``. An entry is fresh for
+``POST_DETAIL_CACHE["TTL"]`` seconds and may then be served stale for
+another ``STALE_TTL`` seconds while one request rebuilds it, so a popular
+post never has every reader miss at once:
+
+- within a worker, concurrent misses for a post wait on the first one's
+  rebuild instead of starting their own;
+- across workers, the rebuild is guarded by a ``cache.add`` lock. The
+  holder rebuilds; the others serve the stale entry if there is one, or
+  wait up to ``WAIT`` seconds for the holder's result.
+
+The signal handlers in ``blog.signals`` delete the entries of the posts a
+post, comment or author write touches once it commits. A rebuild that read
+the database before such a write could otherwise store its outdated detail
+after the delete, so each invalidation first replaces a generation token
+of the post, and a rebuild only keeps its result if the token it read
+before building is still current.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from server.metrics import record_cache_lookup
+
+POLL_INTERVAL = 0.05
+
+_lock = threading.Lock()
+_flights = {}
+
+
+def cache_key(post_id):
+    return f"post-detail:{post_id}"
+
+
+def lock_key(post_id):
+    return f"post-detail-lock:{post_id}"
+
+
+def generation_key(post_id):
+    return f"post-detail-gen:{post_id}"
+
+
+def generation(post_id):
+    return cache.get(generation_key(post_id))
+
+
+def invalidate(*post_ids):
+    if post_ids:
+        transaction.on_commit(lambda: discard(post_ids))
+
+
+def discard(post_ids):
+    # A new token rather than an increment, as the file cache has no
+    # atomic incr and two writers could otherwise leave the same number.
+    cache.set_many(
+        {generation_key(post_id): uuid.uuid4().hex for post_id in post_ids}, None
+    )
+    cache.delete_many([cache_key(post_id) for post_id in post_ids])
+
+
+def single_flight(key, function):
+    """
+    Call ``function`` once for all threads of this worker asking for
+    ``key`` at the same time, and give each of them its result.
+    """
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Future()
+    if not leader:
+        return flight.result()
+    try:
+        result = function()
+    except BaseException as error:
+        flight.set_exception(error)
+        raise
+    else:
+        flight.set_result(result)
+        return result
+    finally:
+        with _lock:
+            del _flights[key]
+
+
+def store(post_id, detail, built_generation):
+    """
+    Cache a detail built at ``built_generation`` unless the post was
+    invalidated since.
+    """
+    if generation(post_id) != built_generation:
+        return
+    config = settings.POST_DETAIL_CACHE
+    entry = {"detail": detail, "fresh_until": time.time() + config["TTL"]}
+    cache.set(cache_key(post_id), entry, config["TTL"] + config["STALE_TTL"])
+    # An invalidation between the check and the write may have deleted
+    # the entry before it was written.
+    if generation(post_id) != built_generation:
+        cache.delete(cache_key(post_id))
+
+
+def build_and_store(post_id, build):
+    built_generation = generation(post_id)
+    detail = build()
+    if detail is not None:
+        store(post_id, detail, built_generation)
+    return detail
+
+
+def rebuild(post_id, build):
+    """
+    Build and store the detail of a post while holding its lock. Returns
+    the detail, or None for a missing post, which is not cached.
+    """
+    try:
+        return build_and_store(post_id, build)
+    finally:
+        cache.delete(lock_key(post_id))
+
+
+def fill(post_id, build):
+    config = settings.POST_DETAIL_CACHE
+    if cache.add(lock_key(post_id), True, config["LOCK_TIMEOUT"]):
+        return rebuild(post_id, build)
+    deadline = time.monotonic() + config["WAIT"]
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(cache_key(post_id))
+        if entry is not None:
+            return entry["detail"]
+    # The holder is slow or gone; build without waiting any longer.
+    return build_and_store(post_id, build)
+
+
+def get_detail(post_id, build):
+    """
+    Return the cached detail of a post, calling ``build`` to render it when
+    needed. ``build`` returns ``{"data": ..., "etag": ...}``, or None for a
+    missing post.
+    """
+    if not settings.POST_DETAIL_CACHE["ENABLED"]:
+        return build()
+    entry = cache.get(cache_key(post_id))
+    fresh = entry is not None and entry["fresh_until"] > time.time()
+    record_cache_lookup("post_detail", fresh)
+    if fresh:
+        return entry["detail"]
+    if entry is None:
+        return single_flight(post_id, lambda: fill(post_id, build))
+    # Stale: whoever takes the lock revalidates, everyone else serves the
+    # old entry meanwhile.
+    if cache.add(lock_key(post_id), True, settings.POST_DETAIL_CACHE["LOCK_TIMEOUT"]):
+        return rebuild(post_id, build)
+    return entry["detail"]
@@ -0,0 +1,115 @@
+"""
+``Idempotency-Key`` support for create endpoints.
+
+A client that retries a create after a timeout sends the same
+``Idempotency-Key`` header. The first request with a key claims it in the
+cache with ``cache.add`` and runs; its response is stored under the key for
+``IDEMPOTENCY["TTL"]`` seconds. A duplicate that arrives while the first is
+still running waits up to ``WAIT`` seconds for it, and any later duplicate
+gets the stored response back, marked ``Idempotent-Replayed: true``,
+without running the view again. Keys are scoped to the user and the path,
+and reusing one with a different body is rejected with 422.
+"""
+
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+POLL_INTERVAL = 0.05
+MAX_KEY_LENGTH = 255
+
+
+def cache_key(request, key):
+    user = request.user.pk if request.user.is_authenticated else "anonymous"
+    scope = f"{user}:{request.method}:{request.path}:{key}"
+    return f"idempotency:{hashlib.sha256(scope.encode()).hexdigest()}"
+
+
+def fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def replay(record):
+    response = Response(record["data"], status=record["status"])
+    for header, value in record["headers"].items():
+        response[header] = value
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def error(message, code, **headers):
+    return Response({"error": message}, status=code, headers=headers)
+
+
+def idempotent(view):
+    """
+    Make a view method safe to retry with an ``Idempotency-Key`` header.
+    Wrap it outside ``transaction.atomic`` so responses are only stored
+    once their writes have committed.
+    """
+
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return error(
+                f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.",
+                status.HTTP_400_BAD_REQUEST,
+            )
+        config = settings.IDEMPOTENCY
+        store_key = cache_key(request, key)
+        claim = {"state": "running", "fingerprint": fingerprint(request)}
+        deadline = time.monotonic() + config["WAIT"]
+        while not cache.add(store_key, claim, config["LOCK_TIMEOUT"]):
+            record = cache.get(store_key)
+            if record is None:
+                # The first request failed and released the key; take over.
+                continue
+            if record["fingerprint"] != claim["fingerprint"]:
+                return error(
+                    f"{HEADER} was already used for a different request.",
+                    status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record["state"] == "done":
+                return replay(record)
+            if time.monotonic() >= deadline:
+                return error(
+                    f"A request with this {HEADER} is still in progress.",
+                    status.HTTP_409_CONFLICT,
+                    **{"Retry-After": str(config["LOCK_TIMEOUT"])},
+                )
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            response = view(self, request, *args, **kwargs)
+        except BaseException:
+            cache.delete(store_key)
+            raise
+        if response.status_code >= 500:
+            # Let a retry run again.
+            cache.delete(store_key)
+            return response
+        cache.set(
+            store_key,
+            {
+                **claim,
+                "state": "done",
+                "status": response.status_code,
+                "data": response.data,
+                "headers": dict(response.items()),
+            },
+            config["TTL"],
+        )
+        return response
+
+    return wrapper
@@ -0,0 +1,251 @@
+"""
+Publish/subscribe for the live comment stream.
+
+``Broker`` fans messages out to the asyncio queues of the stream responses
+in this process. A backend from ``COMMENT_STREAM["BACKEND"]`` carries new
+comments to the brokers: ``LocalBackend`` within one process, and
+``PostgresBackend`` across processes and hosts with ``LISTEN``/``NOTIFY``,
+so a comment posted to a WSGI worker reaches viewers held by an ASGI one.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Max
+from django.utils.module_loading import import_string
+
+from blog.models import Comment
+from blog.serializers import CommentSerializer
+
+logger = logging.getLogger("blog.live")
+
+
+class Subscription:
+    """
+    The queue of one stream response, fed from any thread.
+    """
+
+    def __init__(self, post_id, maxsize):
+        self.post_id = post_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client reconnects with Last-Event-ID and catches up
+            # from the database.
+            self.overflowed = True
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Broker:
+    """
+    Subscriptions of this process by post id.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, post_id):
+        subscription = Subscription(post_id, settings.COMMENT_STREAM["QUEUE_SIZE"])
+        with self._lock:
+            self._subscriptions[post_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.post_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.post_id]
+
+    def has_subscribers(self, post_id):
+        with self._lock:
+            return post_id in self._subscriptions
+
+    def deliver(self, post_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(post_id, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.put, message)
+
+
+def comment_message(comment):
+    return {"id": comment.id, "data": CommentSerializer(comment).data}
+
+
+class LocalBackend:
+    """
+    Deliver to subscribers in the publishing process only.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def start(self):
+        pass
+
+    def publish(self, comment):
+        if self.broker.has_subscribers(comment.post_id):
+            self.broker.deliver(comment.post_id, comment_message(comment))
+
+
+class PostgresBackend:
+    """
+    ``NOTIFY`` the comment id on publish. A thread per subscribing process
+    ``LISTEN``s, loads each comment once and delivers it to local viewers.
+    """
+
+    channel = "blog_comments"
+    poll_interval = 5
+
+    def __init__(self, broker):
+        self.broker = broker
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def publish(self, comment):
+        payload = json.dumps({"post_id": comment.post_id, "id": comment.id})
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, payload])
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self.listen, name="comment-stream", daemon=True
+                )
+                self._thread.start()
+
+    def listen(self):
+        while True:
+            try:
+                self.listen_once()
+            except Exception:
+                logger.exception("Comment stream listener failed, reconnecting.")
+                time.sleep(1)
+
+    def listen_once(self):
+        listener = connection.get_new_connection(connection.get_connection_params())
+        try:
+            listener.autocommit = True
+            with listener.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+            if callable(listener.notifies):
+                # psycopg 3 yields notifications as they arrive.
+                for notify in listener.notifies():
+                    self.receive(notify.payload)
+                return
+            # psycopg2 collects them in a list on poll().
+            while True:
+                ready, _, _ = select.select([listener], [], [], self.poll_interval)
+                if not ready:
+                    continue
+                listener.poll()
+                while listener.notifies:
+                    self.receive(listener.notifies.pop(0).payload)
+        finally:
+            listener.close()
+
+    def receive(self, payload):
+        event = json.loads(payload)
+        if not self.broker.has_subscribers(event["post_id"]):
+            return
+        close_old_connections()
+        comment = Comment.objects.select_related("user").filter(id=event["id"]).first()
+        if comment is not None:
+            self.broker.deliver(comment.post_id, comment_message(comment))
+
+
+broker = Broker()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.COMMENT_STREAM["BACKEND"])(broker)
+        return _backend
+
+
+def publish_comment(comment):
+    """
+    Send a committed comment to everyone watching its post.
+    """
+    try:
+        get_backend().publish(comment)
+    except Exception:
+        # Viewers catch up on their next reconnect.
+        logger.exception("Could not publish comment %s.", comment.id)
+
+
+def format_event(message):
+    return (
+        f"id: {message['id']}\nevent: comment\ndata: {json.dumps(message['data'])}\n\n"
+    )
+
+
+async def backlog(post_id, after):
+    """
+    Messages for the comments on a post after the id ``after``.
+    """
+    comments = (
+        Comment.objects.select_related("user")
+        .filter(post_id=post_id, id__gt=after)
+        .order_by("id")[: settings.COMMENT_STREAM["BACKLOG"]]
+    )
+    return [comment_message(comment) async for comment in comments]
+
+
+async def latest_id(post_id):
+    """
+    The id of the newest comment on a post, or 0 if it has none.
+    """
+    latest = await Comment.objects.filter(post_id=post_id).aaggregate(Max("id"))
+    return latest["id__max"] or 0
+
+
+async def event_stream(post_id, last_event_id=None):
+    """
+    Server-Sent Events for the comments on a post: those after
+    ``last_event_id`` first, then new ones as they are published.
+    """
+    config = settings.COMMENT_STREAM
+    get_backend().start()
+    # Subscribe before reading the backlog so nothing falls in between;
+    # duplicates are skipped by id.
+    subscription = broker.subscribe(post_id)
+    try:
+        yield f"retry: {config['RETRY_MS']}\n\n"
+        last_id = last_event_id or 0
+        if last_event_id is not None:
+            for message in await backlog(post_id, last_event_id):
+                last_id = message["id"]
+                yield format_event(message)
+        while not subscription.overflowed:
+            try:
+                message = await subscription.get(config["HEARTBEAT"])
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message["id"] > last_id:
+                last_id = message["id"]
+                yield format_event(message)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.archive import archive_posts
+
+
+class Command(BaseCommand):
+    help = "Move inactive and old posts with their comments to the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=settings.ARCHIVE["MAX_AGE_DAYS"],
+            help="Also archive posts published more than this many days ago.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.ARCHIVE["BATCH_SIZE"],
+            help="Posts moved per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        moved = archive_posts(
+            max_age_days=options["older_than_days"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} posts."))
@@ -0,0 +1,112 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter and reports how long each startup stage took.
+PROBE = """
+import json, os, resource, sys, time
+
+started = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "server.settings")
+from server.wsgi import application
+app_loaded = time.perf_counter()
+
+from django.urls import get_resolver
+get_resolver().reverse_dict
+urls_loaded = time.perf_counter()
+
+from django.test import RequestFactory
+request = RequestFactory().get("/api/health-check/", HTTP_HOST={host!r})
+environ = request.environ
+status = []
+b"".join(application(environ, lambda s, h, e=None: status.append(s)))
+first_request = time.perf_counter()
+
+print(json.dumps({{
+    "app_ms": (app_loaded - started) * 1000,
+    "urlconf_ms": (urls_loaded - app_loaded) * 1000,
+    "first_request_ms": (first_request - urls_loaded) * 1000,
+    "total_ms": (first_request - started) * 1000,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "docs_loaded": "drf_yasg.views" in sys.modules,
+    "status": status[0],
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold worker startup (app import, URLconf, first request) and "
+        "peak RSS in fresh interpreters. Fails when a --max-* budget is exceeded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument(
+            "--max-total-ms", type=float, help="Fail if median startup is slower."
+        )
+        parser.add_argument(
+            "--max-rss-mb", type=float, help="Fail if median peak RSS is larger."
+        )
+        parser.add_argument("--json", action="store_true")
+
+    def run_probe(self):
+        host = next((host for host in settings.ALLOWED_HOSTS if host), "localhost")
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(host=host)],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "PYTHONWARNINGS": "ignore"},
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        runs = [self.run_probe() for _ in range(max(1, options["runs"]))]
+        report = {
+            key: statistics.median(run[key] for run in runs)
+            for key in (
+                "app_ms",
+                "urlconf_ms",
+                "first_request_ms",
+                "total_ms",
+                "rss_mb",
+                "modules",
+            )
+        }
+        report["runs"] = len(runs)
+        report["docs_loaded"] = any(run["docs_loaded"] for run in runs)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(f"Median of {len(runs)} cold starts:")
+            self.stdout.write(f"  import server.wsgi  {report['app_ms']:8.1f} ms")
+            self.stdout.write(f"  load URLconf        {report['urlconf_ms']:8.1f} ms")
+            self.stdout.write(
+                f"  first request       {report['first_request_ms']:8.1f} ms"
+            )
+            self.stdout.write(f"  total               {report['total_ms']:8.1f} ms")
+            self.stdout.write(f"  peak RSS            {report['rss_mb']:8.1f} MB")
+            self.stdout.write(f"  modules loaded      {report['modules']:8.0f}")
+            self.stdout.write(f"  docs loaded         {report['docs_loaded']!s:>8}")
+
+        failures = []
+        if options["max_total_ms"] and report["total_ms"] > options["max_total_ms"]:
+            failures.append(
+                f"startup {report['total_ms']:.1f} ms > {options['max_total_ms']} ms"
+            )
+        if options["max_rss_mb"] and report["rss_mb"] > options["max_rss_mb"]:
+            failures.append(
+                f"RSS {report['rss_mb']:.1f} MB > {options['max_rss_mb']} MB"
+            )
+        if failures:
+            raise CommandError("Startup budget exceeded: " + "; ".join(failures))
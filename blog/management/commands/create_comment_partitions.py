@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog import partitions
+
+
+class Command(BaseCommand):
+    help = "Create monthly comment partitions for the current and upcoming months."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=settings.COMMENT_PARTITIONS["MONTHS_AHEAD"],
+            help="Months after the current one to create partitions for.",
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            self.stdout.write("The comments table is not partitioned on this database.")
+            return
+        for name in partitions.ensure_partitions(options["months_ahead"]):
+            self.stdout.write(f"Created {name}")
+        self.stdout.write(self.style.SUCCESS("Comment partitions are up to date."))
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver post and comment change events from the outbox to a sink."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sink",
+            nargs="?",
+            help=f"Sink name from OUTBOX['SINKS'] ({', '.join(settings.OUTBOX['SINKS'])}).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.OUTBOX["BATCH_SIZE"],
+            help="Events per delivery.",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches.",
+        )
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep running and poll for new events.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds between polls when idle with --follow.",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Delete events every configured sink has received.",
+        )
+
+    def handle(self, *args, **options):
+        if options["prune"]:
+            deleted = outbox.prune()
+            self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} events."))
+            return
+        name = options["sink"]
+        if name not in settings.OUTBOX["SINKS"]:
+            raise CommandError(f"Choose a sink: {', '.join(settings.OUTBOX['SINKS'])}.")
+        if options["follow"]:
+            outbox.follow(name, options["interval"], options["batch_size"])
+            return
+        delivered = outbox.dispatch(
+            name, options["batch_size"], max_batches=options["max_batches"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Delivered {delivered} events."))
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import partitions
+
+
+class Command(BaseCommand):
+    help = "Drop monthly comment partitions older than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-months",
+            type=int,
+            default=settings.COMMENT_PARTITIONS["RETENTION_MONTHS"],
+            help="Keep this many full months of comments before the current one.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the partitions that would be dropped.",
+        )
+
+    def handle(self, *args, **options):
+        retention = options["older_than_months"]
+        if not retention or retention < 1:
+            raise CommandError(
+                "Set --older-than-months or COMMENT_RETENTION_MONTHS to at least 1."
+            )
+        if not partitions.is_partitioned():
+            self.stdout.write("The comments table is not partitioned on this database.")
+            return
+        if options["dry_run"]:
+            for month in partitions.expired_partitions(retention):
+                self.stdout.write(f"Would drop {partitions.partition_name(month)}")
+            return
+        dropped = partitions.drop_partitions(retention)
+        for name in dropped:
+            self.stdout.write(f"Dropped {name}")
+        self.stdout.write(self.style.SUCCESS(f"Dropped {len(dropped)} partitions."))
@@ -0,0 +1,27 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from server.schema import build_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the OpenAPI schema to a static file so the Swagger UI does not "
+        "introspect the API at request time. Run after collectstatic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.OPENAPI_SCHEMA_FILE,
+            help="Destination file. Defaults to OPENAPI_SCHEMA_FILE.",
+        )
+
+    def handle(self, *args, **options):
+        content = build_schema()
+        os.makedirs(os.path.dirname(options["output"]), exist_ok=True)
+        with open(options["output"], "wb") as schema_file:
+            schema_file.write(content)
+        self.stdout.write(f"Wrote {len(content)} bytes to {options['output']}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from blog.author_stats import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-author statistics from posts and comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Authors recomputed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_all(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} authors."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the publication-date rollups from the posts table."
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} counters."))
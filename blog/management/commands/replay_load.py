@@ -0,0 +1,469 @@
+import io
+import json
+import random
+import string
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Weighted traffic mix used when no --scenario file is given.
+DEFAULT_SCENARIO = {
+    "requests": [
+        {"name": "list", "weight": 30, "method": "GET", "path": "/api/blog/posts/"},
+        {
+            "name": "list_filtered",
+            "weight": 10,
+            "method": "GET",
+            "path": "/api/blog/posts/?title=post&author_name=a&page_size=20",
+        },
+        {
+            "name": "retrieve",
+            "weight": 30,
+            "method": "GET",
+            "path": "/api/blog/posts/{post_id}/",
+        },
+        {
+            "name": "login",
+            "weight": 3,
+            "method": "POST",
+            "path": "/api/auth/login/",
+            "body": {"username": "{username}", "password": "{password}"},
+        },
+        {
+            "name": "refresh",
+            "weight": 5,
+            "method": "POST",
+            "path": "/api/auth/refresh/",
+            "body": {"refreshToken": "{refresh_token}"},
+        },
+        {
+            "name": "comment_add",
+            "weight": 10,
+            "method": "POST",
+            "path": "/api/blog/posts/{post_id}/comments/",
+            "body": {"content": "load replay comment"},
+            "auth": True,
+            "capture": {"comment_id": "id"},
+        },
+        {
+            "name": "comment_remove",
+            "weight": 10,
+            "method": "DELETE",
+            "path": "/api/blog/posts/{post_id}/comments/{comment_id}/",
+            "auth": True,
+        },
+    ]
+}
+
+# Upper bounds (in milliseconds) of the latency histogram buckets.
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class InProcessTransport:
+    """
+    Calls the WSGI application directly, without a socket in between.
+    """
+
+    def __init__(self, host):
+        from server.wsgi import application
+
+        self.application = application
+        self.host = host
+
+    def request(self, method, path, body=None, headers=None):
+        path, _, query = path.partition("?")
+        payload = json.dumps(body).encode() if body is not None else b""
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": self.host,
+            "REMOTE_ADDR": "127.0.0.1",
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(payload)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(payload),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in (headers or {}).items():
+            environ["HTTP_" + name.upper().replace("-", "_")] = value
+
+        status_holder = []
+
+        def start_response(status, response_headers, exc_info=None):
+            status_holder.append(int(status.split(" ", 1)[0]))
+
+        result = self.application(environ, start_response)
+        try:
+            content = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return status_holder[0], content
+
+
+class HTTPTransport:
+    """
+    Sends requests over a keep-alive connection to a running server,
+    e.g. a local gunicorn.
+    """
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                return response.status, response.read()
+            except (ConnectionError, OSError):
+                # The server may close idle keep-alive connections.
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+
+def placeholders(value):
+    """
+    Return the placeholder names used in a scenario string or body.
+    """
+    if isinstance(value, str):
+        return {name for _, name, _, _ in string.Formatter().parse(value) if name}
+    if isinstance(value, dict):
+        return set().union(*(placeholders(v) for v in value.values()))
+    if isinstance(value, list):
+        return set().union(*(placeholders(v) for v in value))
+    return set()
+
+
+def substitute(value, variables):
+    if isinstance(value, str):
+        return value.format(**variables)
+    if isinstance(value, dict):
+        return {k: substitute(v, variables) for k, v in value.items()}
+    if isinstance(value, list):
+        return [substitute(v, variables) for v in value]
+    return value
+
+
+class Worker:
+    """
+    Replays scenario entries against one transport and records the outcome
+    of every request.
+    """
+
+    def __init__(self, options, seed):
+        if options["target"]:
+            self.transport = HTTPTransport(options["target"])
+        else:
+            self.transport = InProcessTransport(options["host"])
+        self.options = options
+        self.random = random.Random(seed)
+        self.variables = {
+            "username": options["username"] or "",
+            "password": options["password"] or "",
+        }
+        # Values captured from earlier responses, e.g. the id of a comment
+        # created by ``comment_add`` for a later ``comment_remove``.
+        self.captured = []
+        self.stats = defaultdict(
+            lambda: {"latencies": [], "statuses": defaultdict(int), "exceptions": 0}
+        )
+
+    def setup(self):
+        if self.options["username"] and self.options["password"]:
+            status_code, content = self.transport.request(
+                "POST",
+                "/api/auth/login/",
+                body={
+                    "username": self.options["username"],
+                    "password": self.options["password"],
+                },
+            )
+            if status_code != 200:
+                raise CommandError(f"Login failed with status {status_code}.")
+            tokens = json.loads(content)
+            self.variables["access_token"] = tokens["accessToken"]
+            self.variables["refresh_token"] = tokens["refreshToken"]
+
+        status_code, content = self.transport.request(
+            "GET", "/api/blog/posts/?page_size=100"
+        )
+        if status_code != 200:
+            raise CommandError(f"Listing posts failed with status {status_code}.")
+        self.post_ids = [post["id"] for post in json.loads(content)["results"]]
+
+    def resolve(self, entry):
+        """
+        Build the variables for an entry, or return None when it cannot run
+        yet (for example removing a comment before one was created).
+        """
+        variables = dict(self.variables)
+        if self.post_ids:
+            variables["post_id"] = self.random.choice(self.post_ids)
+        needed = placeholders(entry["path"]) | placeholders(entry.get("body"))
+        missing = needed - variables.keys()
+        if missing:
+            for index in range(len(self.captured) - 1, -1, -1):
+                if missing <= self.captured[index].keys():
+                    variables.update(self.captured.pop(index))
+                    break
+            else:
+                return None
+        if entry.get("auth") and "access_token" not in variables:
+            return None
+        return variables
+
+    def run_one(self, entry):
+        variables = self.resolve(entry)
+        if variables is None:
+            self.stats[entry["name"]]["statuses"]["skipped"] += 1
+            return
+        headers = {}
+        if entry.get("auth"):
+            headers["Authorization"] = f"Bearer {variables['access_token']}"
+        path = substitute(entry["path"], variables)
+        body = substitute(entry.get("body"), variables)
+
+        started = time.perf_counter()
+        try:
+            status_code, content = self.transport.request(
+                entry.get("method", "GET"), path, body=body, headers=headers
+            )
+        except Exception:
+            self.stats[entry["name"]]["exceptions"] += 1
+            return
+        elapsed = time.perf_counter() - started
+
+        stats = self.stats[entry["name"]]
+        stats["latencies"].append(elapsed)
+        stats["statuses"][status_code] += 1
+        if entry.get("capture") and status_code < 400:
+            data = json.loads(content)
+            captured = {"post_id": variables.get("post_id")}
+            for name, field in entry["capture"].items():
+                captured[name] = data.get(field)
+            self.captured.append(captured)
+            # Keep the backlog bounded when removals are rarer than adds.
+            del self.captured[:-1000]
+
+    def run(self, entries, weights, count, deadline):
+        for entry in self.random.choices(entries, weights=weights, k=count):
+            if deadline and time.monotonic() >= deadline:
+                break
+            self.run_one(entry)
+        return {
+            name: {
+                "latencies": stats["latencies"],
+                "statuses": dict(stats["statuses"]),
+                "exceptions": stats["exceptions"],
+            }
+            for name, stats in self.stats.items()
+        }
+
+
+def run_worker(options, scenario, index, count, deadline):
+    """
+    Entry point for a single pool worker. Must stay importable at module
+    level so it can be pickled for the process pool.
+    """
+    if options["target"] is None:
+        import django
+
+        django.setup()
+    worker = Worker(options, seed=options["seed"] + index)
+    worker.setup()
+    entries = scenario["requests"]
+    weights = [entry.get("weight", 1) for entry in entries]
+    return worker.run(entries, weights, count, deadline)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(results, elapsed):
+    """
+    Merge per-worker results into a per-endpoint report.
+    """
+    merged = defaultdict(
+        lambda: {"latencies": [], "statuses": defaultdict(int), "exceptions": 0}
+    )
+    for result in results:
+        for name, stats in result.items():
+            merged[name]["latencies"].extend(stats["latencies"])
+            merged[name]["exceptions"] += stats["exceptions"]
+            for code, count in stats["statuses"].items():
+                merged[name]["statuses"][code] += count
+
+    endpoints = {}
+    total = 0
+    for name, stats in sorted(merged.items()):
+        latencies = sorted(value * 1000 for value in stats["latencies"])
+        completed = len(latencies)
+        errors = stats["exceptions"] + sum(
+            count
+            for code, count in stats["statuses"].items()
+            if code != "skipped" and code >= 400
+        )
+        histogram = {}
+        for bound in HISTOGRAM_BUCKETS:
+            histogram[f"le_{bound}ms"] = sum(1 for value in latencies if value <= bound)
+        histogram["le_inf"] = completed
+        total += completed + stats["exceptions"]
+        endpoints[name] = {
+            "requests": completed + stats["exceptions"],
+            "skipped": stats["statuses"].get("skipped", 0),
+            "errors": errors,
+            "error_rate": errors / (completed + stats["exceptions"] or 1),
+            "rps": completed / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.50),
+            "p90_ms": percentile(latencies, 0.90),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": latencies[-1] if latencies else 0.0,
+            "statuses": {
+                str(code): count
+                for code, count in stats["statuses"].items()
+                if code != "skipped"
+            },
+            "histogram": histogram,
+        }
+    return {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "rps": total / elapsed if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted scenario of API requests against server.wsgi "
+        "in-process, or against a running server with --target, and report "
+        "throughput, latency and error rates per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            help="Path to a JSON scenario file. Defaults to a built-in mix.",
+        )
+        parser.add_argument(
+            "--target",
+            help="Base URL of a running server, e.g. http://127.0.0.1:8000. "
+            "Requests go straight to the WSGI app when omitted.",
+        )
+        parser.add_argument(
+            "--host", default="localhost", help="Host header for in-process mode."
+        )
+        parser.add_argument("--pool", choices=["thread", "process"], default="thread")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=1000,
+            help="Total number of requests, split across the pool.",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=None,
+            help="Stop after this many seconds even if --requests is not reached.",
+        )
+        parser.add_argument("--username", help="User for authenticated requests.")
+        parser.add_argument("--password")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--json", action="store_true", help="Print the report as JSON."
+        )
+
+    def handle(self, *args, **options):
+        if options["scenario"]:
+            with open(options["scenario"]) as scenario_file:
+                scenario = json.load(scenario_file)
+        else:
+            scenario = DEFAULT_SCENARIO
+        if not scenario.get("requests"):
+            raise CommandError("Scenario has no requests.")
+
+        concurrency = max(1, options["concurrency"])
+        per_worker = [options["requests"] // concurrency] * concurrency
+        for index in range(options["requests"] % concurrency):
+            per_worker[index] += 1
+        worker_options = {
+            key: options[key]
+            for key in ("target", "host", "username", "password", "seed")
+        }
+
+        started = time.monotonic()
+        deadline = started + options["duration"] if options["duration"] else None
+        if concurrency == 1 and options["pool"] == "thread":
+            results = [run_worker(worker_options, scenario, 0, per_worker[0], deadline)]
+        else:
+            executor_class = (
+                ProcessPoolExecutor
+                if options["pool"] == "process"
+                else ThreadPoolExecutor
+            )
+            with executor_class(max_workers=concurrency) as executor:
+                futures = [
+                    executor.submit(
+                        run_worker, worker_options, scenario, index, count, deadline
+                    )
+                    for index, count in enumerate(per_worker)
+                ]
+                results = [future.result() for future in futures]
+        report = summarize(results, time.monotonic() - started)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.write_report(report)
+
+    def write_report(self, report):
+        self.stdout.write(
+            f"{report['requests']} requests in {report['elapsed_s']:.2f}s "
+            f"({report['rps']:.1f} req/s)"
+        )
+        self.stdout.write(
+            f"{'endpoint':<16}{'reqs':>7}{'rps':>9}{'err%':>7}{'skip':>6}"
+            f"{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+        )
+        for name, stats in report["endpoints"].items():
+            self.stdout.write(
+                f"{name:<16}{stats['requests']:>7}{stats['rps']:>9.1f}"
+                f"{stats['error_rate'] * 100:>7.1f}{stats['skipped']:>6}"
+                f"{stats['p50_ms']:>9.2f}{stats['p90_ms']:>9.2f}"
+                f"{stats['p99_ms']:>9.2f}{stats['max_ms']:>9.2f}"
+            )
+        self.stdout.write("")
+        self.stdout.write("Latency histogram (cumulative count per bucket, ms):")
+        for name, stats in report["endpoints"].items():
+            buckets = " ".join(
+                f"{label[3:]}={count}" for label, count in stats["histogram"].items()
+            )
+            self.stdout.write(f"  {name}: {buckets}")
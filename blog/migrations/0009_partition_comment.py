@@ -0,0 +1,103 @@
+# Partition blog_comment by month of ``created`` on Postgres. See
+# blog.partitions. The model state does not change, and other databases keep
+# the plain table.
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations
+
+MONTHS_AHEAD = 3
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_comments(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    execute = schema_editor.execute
+    execute("ALTER TABLE blog_comment RENAME TO blog_comment_unpartitioned")
+    # The primary key of a partitioned table has to include the partition
+    # key. Ids stay unique through the shared sequence created below.
+    execute(
+        "CREATE TABLE blog_comment ("
+        " id bigint NOT NULL,"
+        " content text NOT NULL,"
+        " created timestamp with time zone NOT NULL,"
+        " post_id bigint NOT NULL REFERENCES blog_post (id)"
+        "  DEFERRABLE INITIALLY DEFERRED,"
+        " user_id integer NULL REFERENCES auth_user (id)"
+        "  DEFERRABLE INITIALLY DEFERRED,"
+        " CONSTRAINT blog_comment_partitioned_pkey PRIMARY KEY (id, created)"
+        ") PARTITION BY RANGE (created)"
+    )
+    execute("CREATE INDEX blog_comment_post_created ON blog_comment (post_id, created)")
+    execute("CREATE INDEX blog_comment_user ON blog_comment (user_id)")
+    execute("CREATE TABLE blog_comment_default PARTITION OF blog_comment DEFAULT")
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT min(created), now() FROM blog_comment_unpartitioned")
+        oldest, now = cursor.fetchone()
+    month = datetime.date((oldest or now).year, (oldest or now).month, 1)
+    last = add_months(datetime.date(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        execute(
+            f"CREATE TABLE blog_comment_p{month:%Y%m} PARTITION OF blog_comment "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+            f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+        )
+        month = add_months(month, 1)
+
+    execute(
+        "INSERT INTO blog_comment (id, content, created, post_id, user_id) "
+        "SELECT id, content, created, post_id, user_id FROM blog_comment_unpartitioned"
+    )
+    execute("DROP TABLE blog_comment_unpartitioned")
+    execute("CREATE SEQUENCE blog_comment_id_seq OWNED BY blog_comment.id")
+    execute(
+        "SELECT setval('blog_comment_id_seq', "
+        "coalesce((SELECT max(id) FROM blog_comment), 0) + 1, false)"
+    )
+    execute(
+        "ALTER TABLE blog_comment ALTER COLUMN id "
+        "SET DEFAULT nextval('blog_comment_id_seq')"
+    )
+
+
+def unpartition_comments(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    execute = schema_editor.execute
+    execute(
+        "CREATE TABLE blog_comment_unpartitioned "
+        "(LIKE blog_comment INCLUDING DEFAULTS)"
+    )
+    execute("INSERT INTO blog_comment_unpartitioned SELECT * FROM blog_comment")
+    execute("ALTER SEQUENCE blog_comment_id_seq OWNED BY blog_comment_unpartitioned.id")
+    execute("DROP TABLE blog_comment")
+    execute("ALTER TABLE blog_comment_unpartitioned RENAME TO blog_comment")
+    execute("ALTER TABLE blog_comment ADD PRIMARY KEY (id)")
+    execute(
+        "ALTER TABLE blog_comment ADD FOREIGN KEY (post_id) REFERENCES blog_post (id) "
+        "DEFERRABLE INITIALLY DEFERRED"
+    )
+    execute(
+        "ALTER TABLE blog_comment ADD FOREIGN KEY (user_id) REFERENCES auth_user (id) "
+        "DEFERRABLE INITIALLY DEFERRED"
+    )
+    execute("CREATE INDEX blog_comment_post_id ON blog_comment (post_id)")
+    execute("CREATE INDEX blog_comment_user_id ON blog_comment (user_id)")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0008_archivedpost_archivedcomment"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_comments, unpartition_comments),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0009_partition_comment"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostDateBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("day", "Day"), ("month", "Month"), ("year", "Year")],
+                        max_length=5,
+                    ),
+                ),
+                ("bucket", models.DateField()),
+                ("status", models.CharField(max_length=10)),
+                ("active", models.BooleanField()),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("period", "bucket", "status", "active"),
+                        name="unique_post_date_bucket",
+                    )
+                ],
+            },
+        ),
+    ]
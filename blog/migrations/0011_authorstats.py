@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0010_postdatebucket"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorStats",
+            fields=[
+                (
+                    "author",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="blog.author",
+                    ),
+                ),
+                ("draft_posts", models.IntegerField(default=0)),
+                ("published_posts", models.IntegerField(default=0)),
+                ("comments_received", models.IntegerField(default=0)),
+                ("latest_published_date", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
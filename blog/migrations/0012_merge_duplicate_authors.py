@@ -0,0 +1,37 @@
+# Before Author.user becomes unique, fold every user's extra authors into
+# their oldest one. Stats rows of the kept authors are dropped and rebuilt
+# on their next read.
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def merge_duplicate_authors(apps, schema_editor):
+    Author = apps.get_model("blog", "Author")
+    Post = apps.get_model("blog", "Post")
+    ArchivedPost = apps.get_model("blog", "ArchivedPost")
+    AuthorStats = apps.get_model("blog", "AuthorStats")
+
+    duplicated = (
+        Author.objects.values("user_id")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .values_list("user_id", flat=True)
+    )
+    for user_id in list(duplicated):
+        keep, *extra = Author.objects.filter(user_id=user_id).order_by("id")
+        extra_ids = [author.id for author in extra]
+        Post.objects.filter(author_id__in=extra_ids).update(author_id=keep.id)
+        ArchivedPost.objects.filter(author_id__in=extra_ids).update(author_id=keep.id)
+        AuthorStats.objects.filter(author_id__in=[keep.id, *extra_ids]).delete()
+        Author.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0011_authorstats"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_authors, migrations.RunPython.noop),
+    ]
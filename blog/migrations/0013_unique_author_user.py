@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0012_merge_duplicate_authors"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="author",
+            constraint=models.UniqueConstraint(
+                fields=("user",), name="unique_author_user"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0013_unique_author_user"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="revision",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
 
@@ -8,6 +9,11 @@ class Author(models.Model):
     email = models.EmailField(unique=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user"], name="unique_author_user")
+        ]
+
     def __str__(self):
         return self.email
 
@@ -23,10 +29,28 @@ class Post(models.Model):
         default="draft",
     )
     active = models.BooleanField(default=True)
+    revision = models.PositiveIntegerField(default=1, editable=False)
 
     def __str__(self):
         return self.title
 
+    def bump_revision(self, expected=None):
+        """
+        Increment the revision in one conditional UPDATE, only if it is
+        still ``expected`` when given. Returns False if another write got
+        there first.
+        """
+        queryset = Post.objects.filter(pk=self.pk)
+        if expected is not None:
+            queryset = queryset.filter(revision=expected)
+        if not queryset.update(revision=models.F("revision") + 1):
+            return False
+        if expected is not None:
+            self.revision = expected + 1
+        else:
+            self.refresh_from_db(fields=["revision"])
+        return True
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, related_name="comments", on_delete=models.CASCADE)
@@ -36,3 +60,114 @@ class Comment(models.Model):
 
     def __str__(self):
         return f"Comment by {self.user} on {self.post}"
+
+
+class ArchivedPost(models.Model):
+    """
+    A post moved out of the hot ``Post`` table by ``blog.archive``. Keeps the
+    original id so existing links keep resolving.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    content = models.TextField()
+    published_date = models.DateTimeField()
+    author = models.ForeignKey(Author, on_delete=models.CASCADE)
+    status = models.CharField(
+        max_length=10,
+        choices=[("draft", "Draft"), ("published", "Published")],
+        default="draft",
+    )
+    active = models.BooleanField(default=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost, related_name="comments", on_delete=models.CASCADE
+    )
+    content = models.TextField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    created = models.DateTimeField()
+
+    def __str__(self):
+        return f"Comment by {self.user} on {self.post}"
+
+
+class PostDateBucket(models.Model):
+    """
+    Number of posts published in one day, month or year with a given status
+    and active flag. Maintained incrementally by ``blog.rollups``.
+    """
+
+    period = models.CharField(
+        max_length=5, choices=[("day", "Day"), ("month", "Month"), ("year", "Year")]
+    )
+    bucket = models.DateField()
+    status = models.CharField(max_length=10)
+    active = models.BooleanField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "bucket", "status", "active"],
+                name="unique_post_date_bucket",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.period} {self.bucket} {self.status}: {self.count}"
+
+
+class AuthorStats(models.Model):
+    """
+    Per-author aggregates over live posts and their comments. Maintained
+    by ``blog.author_stats`` in the same transaction as each write.
+    """
+
+    author = models.OneToOneField(
+        Author, primary_key=True, related_name="stats", on_delete=models.CASCADE
+    )
+    draft_posts = models.IntegerField(default=0)
+    published_posts = models.IntegerField(default=0)
+    comments_received = models.IntegerField(default=0)
+    latest_published_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.author}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A post or comment change, written in the same transaction as the change
+    and delivered to downstream sinks by ``dispatch_outbox``. The id is the
+    offset consumers track.
+    """
+
+    topic = models.CharField(max_length=20)
+    event = models.CharField(max_length=10)
+    object_id = models.BigIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.topic} {self.object_id} {self.event}"
+
+
+class OutboxOffset(models.Model):
+    """
+    The last outbox event id delivered to a sink.
+    """
+
+    sink = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.sink} at {self.position}"
@@ -0,0 +1,226 @@
+"""
+Transactional outbox for post and comment changes.
+
+The signal handlers in ``blog.signals`` add an ``OutboxEvent`` in the same
+transaction as every post or comment create, update and delete, so an
+event exists exactly when its change committed. Posts and comments moved
+to the archive tables get an ``archived`` event instead of ``deleted``:
+they are still served. ``dispatch_outbox`` reads
+events in id order and hands them in batches to a sink configured in
+``OUTBOX["SINKS"]``, recording the last delivered id per sink in
+``OutboxOffset``. Delivery is at least once: a batch that fails is retried
+on the next run, and the offset does not move past a missing id while the
+transaction that may hold it is still running, see ``pending_events``.
+"""
+
+import json
+import os
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+from django.utils.module_loading import import_string
+
+from blog.models import OutboxEvent, OutboxOffset
+
+POST_FIELDS = [
+    "id",
+    "title",
+    "content",
+    "published_date",
+    "author_id",
+    "status",
+    "active",
+    "revision",
+]
+COMMENT_FIELDS = ["id", "post_id", "content", "user_id", "created"]
+
+# Snapshot xmax when each open gap was first seen, by the id after the gap.
+_gap_horizons = {}
+
+
+def record(topic, instance, event, fields):
+    OutboxEvent.objects.create(
+        topic=topic,
+        event=event,
+        object_id=instance.pk,
+        payload={field: getattr(instance, field) for field in fields},
+    )
+
+
+def record_post(post, event):
+    record("post", post, event, POST_FIELDS)
+
+
+def record_comment(comment, event):
+    record("comment", comment, event, COMMENT_FIELDS)
+
+
+def serialize(event):
+    return {
+        "id": event.id,
+        "topic": event.topic,
+        "event": event.event,
+        "object_id": event.object_id,
+        "payload": event.payload,
+        "created_at": event.created_at,
+    }
+
+
+class FileSink:
+    """
+    Append events as newline-delimited JSON to ``PATH``.
+    """
+
+    def __init__(self, name, options):
+        self.path = options["PATH"]
+
+    def deliver(self, events):
+        with open(self.path, "a", encoding="utf-8") as stream:
+            for event in events:
+                stream.write(json.dumps(event, cls=DjangoJSONEncoder) + "\n")
+            stream.flush()
+            os.fsync(stream.fileno())
+
+
+class HTTPSink:
+    """
+    POST each batch as ``{"events": [...]}`` to ``URL``. Any non-2xx
+    response fails the batch.
+    """
+
+    def __init__(self, name, options):
+        self.url = options["URL"]
+        self.timeout = options.get("TIMEOUT", 10)
+        self.headers = {
+            "Content-Type": "application/json",
+            **options.get("HEADERS", {}),
+        }
+
+    def deliver(self, events):
+        body = json.dumps({"events": events}, cls=DjangoJSONEncoder).encode()
+        request = urllib.request.Request(
+            self.url, data=body, headers=self.headers, method="POST"
+        )
+        # urlopen raises HTTPError for non-2xx responses.
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def get_sink(name):
+    try:
+        options = settings.OUTBOX["SINKS"][name]
+    except KeyError:
+        raise ValueError(f"Unknown outbox sink {name!r}.")
+    return import_string(options["BACKEND"])(name, options)
+
+
+def current_snapshot():
+    """
+    ``(xmin, xmax)`` of the current Postgres snapshot, or None on other
+    databases. Every transaction below ``xmin`` has ended, and every one
+    still running is below ``xmax``.
+    """
+    connection = connections[router.db_for_read(OutboxEvent)]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_snapshot_xmin(s)::text::bigint,"
+            " pg_snapshot_xmax(s)::text::bigint FROM pg_current_snapshot() s"
+        )
+        return cursor.fetchone()
+
+
+def gap_closed(event_id):
+    """
+    Whether ids missing below ``event_id`` can no longer be committed.
+
+    Such an id was taken before ``event_id``, which has committed, so its
+    transaction has either ended or was running when the gap was first
+    seen. The gap closes once every transaction running then has ended.
+    """
+    snapshot = current_snapshot()
+    if snapshot is None:
+        # SQLite commits one writing transaction at a time, so a missing id
+        # was rolled back.
+        return True
+    xmin, xmax = snapshot
+    horizon = _gap_horizons.setdefault(event_id, xmax)
+    if xmin < horizon:
+        return False
+    del _gap_horizons[event_id]
+    return True
+
+
+def pending_events(position, batch_size):
+    """
+    The next events after ``position`` that can be delivered in id order.
+
+    Ids are assigned at insert but become visible at commit, so a missing id
+    may belong to a transaction that is still open. Delivery stops before
+    such a gap until ``gap_closed``; a rolled back id only holds it up
+    while the transactions running at the time finish. Gaps are remembered
+    per process: a restarted dispatcher waits for the transactions running
+    when it looks again.
+    """
+    events = list(
+        OutboxEvent.objects.filter(id__gt=position).order_by("id")[:batch_size]
+    )
+    # Also checked for a new sink: its first event may follow an open id.
+    expected = position + 1
+    for index, event in enumerate(events):
+        if event.id != expected and not gap_closed(event.id):
+            return events[:index]
+        expected = event.id + 1
+    return events
+
+
+def dispatch(name, batch_size=None, max_batches=None):
+    """
+    Deliver pending events to the sink ``name`` until caught up. Returns
+    the number of events delivered.
+    """
+    sink = get_sink(name)
+    batch_size = batch_size or settings.OUTBOX["BATCH_SIZE"]
+    offset, _ = OutboxOffset.objects.get_or_create(sink=name)
+    delivered = batches = 0
+    while max_batches is None or batches < max_batches:
+        events = pending_events(offset.position, batch_size)
+        if not events:
+            break
+        sink.deliver([serialize(event) for event in events])
+        offset.position = events[-1].id
+        offset.save(update_fields=["position", "updated_at"])
+        delivered += len(events)
+        batches += 1
+    return delivered
+
+
+def follow(name, interval, batch_size=None):
+    """
+    Dispatch forever, polling every ``interval`` seconds when idle.
+    """
+    while True:
+        if not dispatch(name, batch_size):
+            time.sleep(interval)
+
+
+def prune():
+    """
+    Delete events every configured sink has received. Returns the number
+    deleted.
+    """
+    names = list(settings.OUTBOX["SINKS"])
+    positions = dict(
+        OutboxOffset.objects.filter(sink__in=names).values_list("sink", "position")
+    )
+    if not names or set(positions) != set(names):
+        return 0
+    with transaction.atomic():
+        deleted, _ = OutboxEvent.objects.filter(
+            id__lte=min(positions.values())
+        ).delete()
+    return deleted
@@ -0,0 +1,152 @@
+"""
+Page-number pagination with planner-estimated counts.
+
+Filling ``count`` on every list page costs a ``COUNT(*)`` over the whole
+filtered set. With ``POST_LIST_COUNT["MODE"]`` set to ``estimated``, the
+count of a large set is the row estimate of ``EXPLAIN`` for its query
+instead. (``pg_class.reltuples`` would be cheaper still, but it counts the
+whole table and the list is always filtered by ``active``.) Sets estimated
+below ``THRESHOLD`` rows, and every set on other databases, are counted
+exactly, and exact counts are cached per query for ``CACHE_TTL`` seconds.
+
+An estimate can be far off, so pages are not checked against it: a page
+fetches one row more than it shows, and there is a next page exactly when
+that row exists. For the same reason there is no ``?page=last`` of an
+estimated set.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+def cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    signature = repr((queryset.db, sql, params)).encode()
+    return f"post-count:{hashlib.sha256(signature).hexdigest()}"
+
+
+def planner_estimate(queryset):
+    """
+    The number of rows the Postgres planner expects ``queryset`` to return,
+    or None on other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def exact_count(queryset):
+    key = cache_key(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.POST_LIST_COUNT["CACHE_TTL"])
+    return count
+
+
+class EstimatedPage(Page):
+    """
+    A page that knows whether rows follow it without a count.
+    """
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator whose ``count`` may be a planner estimate; ``estimated``
+    tells which. Pages of an estimated set are not limited by the count.
+    """
+
+    estimated = False
+
+    def validate_number(self, number):
+        self.count  # Decides whether the count is an estimate.
+        if not self.estimated:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        return EstimatedPage(
+            rows[: self.per_page], number, self, len(rows) > self.per_page
+        )
+
+    @cached_property
+    def count(self):
+        config = settings.POST_LIST_COUNT
+        try:
+            if config["MODE"] == "estimated":
+                estimate = planner_estimate(self.object_list)
+                if estimate is not None and estimate >= config["THRESHOLD"]:
+                    self.estimated = True
+                    return estimate
+            return exact_count(self.object_list)
+        except EmptyResultSet:
+            return 0
+
+
+class PostPagination(PageNumberPagination):
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_page_number(self, request, paginator):
+        page_number = request.query_params.get(self.page_query_param)
+        if page_number in self.last_page_strings:
+            paginator.count  # Decides whether the count is an estimate.
+            if paginator.estimated:
+                raise ValidationError(
+                    {
+                        self.page_query_param: [
+                            "The last page of an estimated count is unknown; "
+                            "follow the next links instead."
+                        ]
+                    }
+                )
+        return super().get_page_number(request, paginator)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_estimated": self.page.paginator.estimated,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
@@ -0,0 +1,152 @@
+"""
+Monthly range partitions of the comments table on Postgres.
+
+Migration 0009 turns ``blog_comment`` into a table partitioned by
+``created``. Each month lives in ``blog_comment_pYYYYMM``, created ahead of
+time by ``create_comment_partitions``; rows outside every monthly partition
+land in ``blog_comment_default`` and are moved out when their month is
+created. ``drop_comment_partitions`` removes whole months, which is far
+cheaper than ``DELETE`` followed by vacuum.
+
+On other databases the table stays unpartitioned and these helpers do
+nothing. The ``Comment`` model is the same either way.
+"""
+
+import datetime
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+TABLE = "blog_comment"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+_PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+def month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def bound(month):
+    """
+    SQL literal for the first instant of ``month`` in UTC.
+    """
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """
+    Return the months that have a partition, oldest first.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    months = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months.append(datetime.date(int(match[1]), int(match[2]), 1))
+    return sorted(months)
+
+
+def create_partition(month):
+    """
+    Create the partition for ``month``, moving any of its rows out of the
+    default partition first so attaching it cannot fail.
+    """
+    name = partition_name(month)
+    lower, upper = bound(month), bound(add_months(month, 1))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE created >= {lower} AND created < {upper} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ({lower}) TO ({upper})"
+        )
+    return name
+
+
+def ensure_partitions(months_ahead=None):
+    """
+    Create the partitions for the current month and ``months_ahead`` months
+    after it. Returns the names of the partitions created.
+    """
+    if not is_partitioned():
+        return []
+    if months_ahead is None:
+        months_ahead = settings.COMMENT_PARTITIONS["MONTHS_AHEAD"]
+    existing = set(list_partitions())
+    current = month_start(timezone.now())
+    return [
+        create_partition(month)
+        for month in (add_months(current, offset) for offset in range(months_ahead + 1))
+        if month not in existing
+    ]
+
+
+def expired_partitions(retention_months):
+    """
+    Months whose partitions hold only comments older than
+    ``retention_months`` full months.
+    """
+    cutoff = add_months(month_start(timezone.now()), -retention_months)
+    return [month for month in list_partitions() if add_months(month, 1) <= cutoff]
+
+
+def drop_partitions(retention_months=None):
+    """
+    Drop the partitions past retention, and expired rows stranded in the
+    default partition. Returns the names of the partitions dropped.
+    """
+    if not is_partitioned():
+        return []
+    if retention_months is None:
+        retention_months = settings.COMMENT_PARTITIONS["RETENTION_MONTHS"]
+    if not retention_months:
+        return []
+    dropped = []
+    for month in expired_partitions(retention_months):
+        name = partition_name(month)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+        dropped.append(name)
+    cutoff = add_months(month_start(timezone.now()), -retention_months)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE created < {bound(cutoff)}"
+        )
+    return dropped
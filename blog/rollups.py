@@ -0,0 +1,114 @@
+"""
+Publication-date rollups of posts.
+
+``PostDateBucket`` holds one counter per period, bucket, status and active
+flag. The signal handlers in ``blog.signals`` move a post between counters
+whenever it is created, changed or deleted, so ``histogram`` reads a few
+rows per bucket no matter how many posts there are. Archived posts keep
+their counts. ``rebuild`` recomputes the table from ``Post`` and
+``ArchivedPost`` for bulk writes that bypass signals.
+"""
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncYear
+from django.utils import timezone
+
+from blog.models import ArchivedPost, Post, PostDateBucket
+
+PERIODS = {"day": TruncDay, "month": TruncMonth, "year": TruncYear}
+
+
+def truncate(value, period):
+    day = timezone.localtime(value).date()
+    if period == "year":
+        return day.replace(month=1, day=1)
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def post_state(post):
+    """
+    The fields of a post that decide its counters.
+    """
+    return (post.published_date, post.status, post.active)
+
+
+def adjust(state, delta):
+    published_date, status, active = state
+    for period in PERIODS:
+        key = {
+            "period": period,
+            "bucket": truncate(published_date, period),
+            "status": status,
+            "active": active,
+        }
+        counter = PostDateBucket.objects.filter(**key)
+        if counter.update(count=F("count") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                PostDateBucket.objects.create(count=delta, **key)
+        except IntegrityError:
+            # Created concurrently by another writer.
+            counter.update(count=F("count") + delta)
+
+
+def record_change(old_state, new_state):
+    """
+    Move a post from the counters of ``old_state`` to those of ``new_state``.
+    Either may be None for a created or deleted post.
+    """
+    if old_state == new_state:
+        return
+    with transaction.atomic():
+        if old_state is not None:
+            adjust(old_state, -1)
+        if new_state is not None:
+            adjust(new_state, 1)
+
+
+def histogram(period, status=None, active=True):
+    """
+    Return ``[{"bucket": date, "count": n}]`` ordered by bucket.
+    """
+    counters = PostDateBucket.objects.filter(period=period, active=active, count__gt=0)
+    if status:
+        counters = counters.filter(status=status)
+    return list(
+        counters.values("bucket").annotate(count=Sum("count")).order_by("bucket")
+    )
+
+
+def rebuild():
+    """
+    Recompute every counter from ``Post`` and ``ArchivedPost``. Returns the
+    number of counters.
+    """
+    totals = Counter()
+    for model in (Post, ArchivedPost):
+        for period, trunc in PERIODS.items():
+            rows = (
+                model.objects.annotate(
+                    bucket=trunc("published_date", output_field=DateField())
+                )
+                .values("bucket", "status", "active")
+                .annotate(count=Count("id"))
+                .order_by()
+            )
+            for row in rows:
+                key = (period, row["bucket"], row["status"], row["active"])
+                totals[key] += row["count"]
+    counters = [
+        PostDateBucket(
+            period=period, bucket=bucket, status=status, active=active, count=count
+        )
+        for (period, bucket, status, active), count in totals.items()
+    ]
+    with transaction.atomic():
+        PostDateBucket.objects.all().delete()
+        PostDateBucket.objects.bulk_create(counters)
+    return len(counters)
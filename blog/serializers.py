@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from .models import Author, Post, Comment
+from server.timing import TimedSerializerMixin
+from .models import Author, AuthorStats, Post, Comment
 
 
-class PostMinimalSerializer(serializers.ModelSerializer):
+class PostMinimalSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author_name = serializers.SerializerMethodField()
 
     class Meta:
@@ -21,7 +22,7 @@ class PostMinimalSerializer(serializers.ModelSerializer):
         return obj.author.name if obj.author else "Unknown Author"
 
 
-class PostWithCommentsSerializer(serializers.ModelSerializer):
+class PostWithCommentsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     comments = serializers.SerializerMethodField()
     author_name = serializers.SerializerMethodField()
 
@@ -31,14 +32,18 @@ class PostWithCommentsSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "published_date"]
 
     def get_comments(self, obj):
-        coments_queryset = Comment.objects.filter(post=obj)
+        # Capped comments from archive.get_posts, else the related manager so
+        # archived posts resolve their archived comments.
+        coments_queryset = getattr(obj, "first_comments", None)
+        if coments_queryset is None:
+            coments_queryset = obj.comments.all()
         return CommentSerializer(coments_queryset, many=True).data
 
     def get_author_name(self, obj):
         return obj.author.name if obj.author else "Unknown Author"
 
 
-class PostCreateSerializer(serializers.ModelSerializer):
+class PostCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = ["title", "content", "author", "status", "active"]
@@ -63,7 +68,7 @@ class PostCreateSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = serializers.SerializerMethodField()
 
     class Meta:
@@ -74,3 +79,18 @@ class CommentSerializer(serializers.ModelSerializer):
         if obj.user:
             return obj.user.username
         return None
+
+
+class AuthorStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    author_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = AuthorStats
+        fields = [
+            "author_id",
+            "draft_posts",
+            "published_posts",
+            "comments_received",
+            "latest_published_date",
+            "updated_at",
+        ]
@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from blog import archive, author_stats, authors, detail_cache, live, outbox, rollups
+from blog.models import Author, AuthorStats, Comment, Post
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    instance._previous = None
+    if instance.pk is not None:
+        instance._previous = (
+            Post.objects.filter(pk=instance.pk)
+            .only("published_date", "status", "active", "author_id")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Post)
+def update_post_rollups(sender, instance, **kwargs):
+    previous = instance._previous
+    rollups.record_change(
+        rollups.post_state(previous) if previous else None,
+        rollups.post_state(instance),
+    )
+    author_stats.record_post_change(previous, instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_rollups(sender, instance, **kwargs):
+    # Archived posts are still served and keep their counts.
+    if archive.archiving():
+        return
+    rollups.record_change(rollups.post_state(instance), None)
+    author_stats.record_post_change(instance, None)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        author_stats.record_comment_change(instance, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    if not archive.archiving():
+        author_stats.record_comment_change(instance, -1)
+
+
+@receiver(post_save, sender=Post)
+def record_post_event(sender, instance, created, **kwargs):
+    outbox.record_post(instance, "created" if created else "updated")
+
+
+@receiver(post_delete, sender=Post)
+def record_post_deletion(sender, instance, **kwargs):
+    outbox.record_post(instance, "archived" if archive.archiving() else "deleted")
+
+
+@receiver(post_save, sender=Comment)
+def record_comment_event(sender, instance, created, **kwargs):
+    outbox.record_comment(instance, "created" if created else "updated")
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: live.publish_comment(instance))
+
+
+@receiver(post_delete, sender=Comment)
+def record_comment_deletion(sender, instance, **kwargs):
+    outbox.record_comment(instance, "archived" if archive.archiving() else "deleted")
+
+
+@receiver(post_save, sender=Author)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(author=instance)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def evict_cached_author(sender, instance, **kwargs):
+    authors.evict(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_detail(sender, instance, **kwargs):
+    detail_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post_detail(sender, instance, **kwargs):
+    detail_cache.invalidate(instance.post_id)
+
+
+@receiver(post_save, sender=Author)
+def invalidate_author_post_details(sender, instance, created, **kwargs):
+    if not created:
+        detail_cache.invalidate(
+            *Post.objects.filter(author=instance).values_list("pk", flat=True)
+        )
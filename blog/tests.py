@@ -1,7 +1,37 @@
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.error import HTTPError
+
+from asgiref.sync import sync_to_async
 from rest_framework.test import APITestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
-from blog.models import Post, Author, Comment
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from blog import authors, detail_cache, idempotency, live, outbox, partitions
+from blog.models import (
+    ArchivedComment,
+    ArchivedPost,
+    AuthorStats,
+    Post,
+    PostDateBucket,
+    Author,
+    Comment,
+    OutboxEvent,
+    OutboxOffset,
+)
 from django.utils import timezone
 
 
@@ -23,7 +53,7 @@ class PostListEndpointTests(APITestCase):
         self.another_test_author = Author.objects.create(
             name="Test Author",
             email="another_test_user@example.com",
-            user=self.test_user,
+            user=self.another_test_user,
         )
 
         # Create test post dated today
@@ -294,6 +324,168 @@ class PostListEndpointTests(APITestCase):
         )
 
 
+class PostListCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        for number in range(3):
+            Post.objects.create(
+                title=f"Post {number}", content="Content", author=self.test_author
+            )
+
+    def test_exact_count_is_cached_per_filter(self):
+        """Test that small sets are counted exactly and the count is reused."""
+        response = self.client.get(reverse("post-list"))
+        self.assertEqual(response.data["count"], 3)
+        self.assertFalse(response.data["count_estimated"])
+
+        Post.objects.create(title="Post 3", content="Content", author=self.test_author)
+        self.assertEqual(self.client.get(reverse("post-list")).data["count"], 3)
+        response = self.client.get(reverse("post-list"), {"title": "Post"})
+        self.assertEqual(response.data["count"], 4)
+
+    @mock.patch("blog.pagination.planner_estimate", return_value=50000)
+    def test_large_sets_use_the_planner_estimate(self, estimate):
+        """Test that a set estimated above the threshold is not counted."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("post-list"))
+        self.assertEqual(response.data["count"], 50000)
+        self.assertTrue(response.data["count_estimated"])
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in queries.captured_queries)
+        )
+
+    @override_settings(
+        POST_LIST_COUNT={"MODE": "estimated", "THRESHOLD": 1, "CACHE_TTL": 10}
+    )
+    @mock.patch("blog.pagination.planner_estimate", return_value=2)
+    def test_pages_past_an_underestimate_are_reachable(self, estimate):
+        """Test that next links follow the rows, not a too low estimate."""
+        for number in range(3, 7):
+            Post.objects.create(
+                title=f"Post {number}", content="Content", author=self.test_author
+            )
+        titles = []
+        url = reverse("post-list") + "?page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data["count_estimated"])
+            titles.extend(post["title"] for post in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(len(titles), 7)
+        self.assertEqual(len(set(titles)), 7)
+
+        response = self.client.get(reverse("post-list"), {"page_size": 2, "page": 5})
+        self.assertEqual(response.status_code, 404)
+
+    @mock.patch("blog.pagination.planner_estimate", return_value=50000)
+    def test_last_page_of_an_estimate_is_rejected(self, estimate):
+        """Test that page=last is a 400 when the count is estimated."""
+        response = self.client.get(reverse("post-list"), {"page": "last"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("page", response.data)
+
+    def test_last_page_of_an_exact_count(self):
+        """Test that page=last still works when the count is exact."""
+        response = self.client.get(
+            reverse("post-list"), {"page": "last", "page_size": 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data["count_estimated"])
+        self.assertEqual(len(response.data["results"]), 1)
+
+    @override_settings(
+        POST_LIST_COUNT={"MODE": "exact", "THRESHOLD": 0, "CACHE_TTL": 10}
+    )
+    @mock.patch("blog.pagination.planner_estimate", return_value=50000)
+    def test_exact_mode_ignores_estimates(self, estimate):
+        """Test that the exact mode always counts."""
+        response = self.client.get(reverse("post-list"))
+        self.assertEqual(response.data["count"], 3)
+        self.assertFalse(response.data["count_estimated"])
+        estimate.assert_not_called()
+
+
+class PostBatchTests(APITestCase):
+    def setUp(self):
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        self.posts = [
+            Post.objects.create(
+                title=f"Post {number}", content="Content", author=self.test_author
+            )
+            for number in range(3)
+        ]
+        for post in self.posts:
+            for number in range(3):
+                Comment.objects.create(
+                    post=post, content=f"Comment {number}", user=self.test_user
+                )
+        self.url = reverse("post-batch")
+
+    def test_batch_keeps_order_and_reports_missing(self):
+        """Test that posts come back in the requested order with missing ids."""
+        ids = [self.posts[2].id, 999, self.posts[0].id, self.posts[2].id]
+        response = self.client.get(self.url, {"ids": ",".join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [post["title"] for post in response.data["results"]], ["Post 2", "Post 0"]
+        )
+        self.assertNotIn("comments", response.data["results"][0])
+        self.assertEqual(response.data["missing"], [999])
+
+    def test_batch_query_count_is_constant(self):
+        """Test that more ids and comments do not cost more queries."""
+        ids = [post.id for post in self.posts]
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                self.url, {"ids": ids, "comments": 2}, format="json"
+            )
+        self.assertEqual(
+            [len(post["comments"]) for post in response.data["results"]], [2, 2, 2]
+        )
+        self.assertEqual(
+            [comment["content"] for comment in response.data["results"][0]["comments"]],
+            ["Comment 0", "Comment 1"],
+        )
+        with self.assertNumQueries(2):
+            self.client.post(self.url, {"ids": ids[:1], "comments": 2}, format="json")
+
+    def test_batch_includes_archived_posts(self):
+        """Test that archived posts are found with their comments."""
+        Post.objects.filter(pk=self.posts[1].pk).update(active=False)
+        call_command("archive_posts", stdout=StringIO())
+        response = self.client.get(
+            self.url, {"ids": f"{self.posts[1].id},{self.posts[0].id}", "comments": 5}
+        )
+        self.assertEqual(
+            [post["title"] for post in response.data["results"]], ["Post 1", "Post 0"]
+        )
+        self.assertEqual(len(response.data["results"][0]["comments"]), 3)
+        self.assertEqual(response.data["missing"], [])
+
+    @override_settings(POST_BATCH={"MAX_IDS": 2, "MAX_COMMENTS": 20})
+    def test_batch_rejects_bad_requests(self):
+        """Test that invalid, empty and oversized id lists are rejected."""
+        for ids in ["", "1,x", "1,2,3"]:
+            response = self.client.get(self.url, {"ids": ids})
+            self.assertEqual(response.status_code, 400)
+        for body in [{"ids": "12"}, {"ids": {"1": 1}}, {"ids": 1}, [1, 2], {}]:
+            response = self.client.post(self.url, body, format="json")
+            self.assertEqual(response.status_code, 400, body)
+
+
 class PostCreateUpdateDeleteEndpointTests(APITestCase):
     def setUp(self):
         # Create test user and author
@@ -384,6 +576,305 @@ class PostCreateUpdateDeleteEndpointTests(APITestCase):
         self.assertEqual(Post.objects.count(), 0)
 
 
+class AuthorResolutionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        response = self.client.post(
+            reverse("login"),
+            {"username": "testuser", "password": "testpassword"},
+            format="json",
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.data['accessToken']}"
+        )
+        self.valid_data = {"title": "New Post", "content": "Content", "status": "draft"}
+
+    def test_first_post_creates_one_author(self):
+        """Test that a user's posts share one author created on first write."""
+        for _ in range(2):
+            response = self.client.post(
+                reverse("post-list"), self.valid_data, format="json"
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data["author_name"], "testuser")
+        self.assertEqual(Author.objects.filter(user=self.test_user).count(), 1)
+        self.assertEqual(Post.objects.values("author").distinct().count(), 1)
+
+    def test_author_user_is_unique(self):
+        """Test that a second author for the same user is rejected."""
+        Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Author.objects.create(
+                name="Other Author", email="other@example.com", user=self.test_user
+            )
+
+    def test_cached_author_skips_lookup_and_follows_changes(self):
+        """Test that a cached author costs no query and is evicted on change."""
+        with self.captureOnCommitCallbacks(execute=True):
+            author = authors.get_author(self.test_user)
+        with self.assertNumQueries(0):
+            self.assertEqual(authors.get_author(self.test_user).pk, author.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            author.name = "Renamed Author"
+            author.save()
+        self.assertEqual(authors.get_author(self.test_user).name, "Renamed Author")
+
+
+class IdempotencyTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        response = self.client.post(
+            reverse("login"),
+            {"username": "testuser", "password": "testpassword"},
+            format="json",
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.data['accessToken']}"
+        )
+        self.data = {"title": "New Post", "content": "Content", "status": "draft"}
+
+    def create(self, data, key="key-1"):
+        return self.client.post(
+            reverse("post-list"), data, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retried_create_is_replayed(self):
+        """Test that a retried create returns the first response without writing."""
+        first = self.create(self.data)
+        second = self.create(self.data)
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Post.objects.count(), 1)
+
+        self.assertEqual(self.create(self.data, key="key-2").status_code, 201)
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_retried_comment_is_replayed(self):
+        """Test that an anonymous comment retried with its key is added once."""
+        self.client.credentials()
+        post = Post.objects.create(
+            title="Test Post", content="Content", author=self.test_author
+        )
+        url = reverse("add_comment", args=[post.id])
+        for _ in range(2):
+            response = self.client.post(
+                url, {"content": "Hello"}, format="json", HTTP_IDEMPOTENCY_KEY="c-1"
+            )
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(Comment.objects.filter(post=post).count(), 1)
+
+    def test_key_reused_for_another_body_is_rejected(self):
+        """Test that a key cannot be replayed for a different request."""
+        self.create(self.data)
+        response = self.create({**self.data, "title": "Other Post"})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_duplicate_waits_for_the_request_in_flight(self):
+        """Test that a duplicate waits for the running request and replays it."""
+        request = SimpleNamespace(
+            user=self.test_user, method="POST", path=reverse("post-list")
+        )
+        key = idempotency.cache_key(request, "key-1")
+        claim = {
+            "state": "running",
+            "fingerprint": idempotency.fingerprint(SimpleNamespace(data=self.data)),
+        }
+        cache.add(key, claim)
+
+        with override_settings(
+            IDEMPOTENCY={"TTL": 60, "LOCK_TIMEOUT": 30, "WAIT": 0.1}
+        ):
+            response = self.create(self.data)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "30")
+
+        done = {
+            **claim,
+            "state": "done",
+            "status": 201,
+            "data": {"id": 7},
+            "headers": {},
+        }
+        finish = threading.Timer(0.2, cache.set, [key, done])
+        finish.start()
+        self.addCleanup(finish.cancel)
+        response = self.create(self.data)
+        self.assertEqual((response.status_code, response.data), (201, {"id": 7}))
+        self.assertEqual(Post.objects.count(), 0)
+
+
+class PostRevisionTests(APITestCase):
+    def setUp(self):
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        self.post = Post.objects.create(
+            title="Test Post", content="Test content", author=self.test_author
+        )
+        response = self.client.post(
+            reverse("login"),
+            {"username": "testuser", "password": "testpassword"},
+            format="json",
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.data['accessToken']}"
+        )
+        self.url = reverse("post-detail", args=[self.post.id])
+
+    def test_etag_tracks_revision(self):
+        """Test that reads and writes expose the revision as an ETag."""
+        self.assertEqual(self.client.get(self.url)["ETag"], '"1"')
+        response = self.client.patch(self.url, {"title": "Edited"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"2"')
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.revision), ("Edited", 2))
+
+    def test_matching_if_match_updates(self):
+        """Test that an update with the current revision succeeds."""
+        response = self.client.patch(
+            self.url, {"title": "Edited"}, format="json", HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"2"')
+
+    def test_stale_if_match_is_rejected(self):
+        """Test that an update with an old revision gets 412 and changes nothing."""
+        self.post.bump_revision()
+        response = self.client.put(
+            self.url,
+            {"title": "Edited", "content": "Edited", "status": "draft"},
+            format="json",
+            HTTP_IF_MATCH='"1"',
+        )
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response["ETag"], '"2"')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, "Test Post")
+
+        response = self.client.delete(self.url, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_bump_revision_is_conditional(self):
+        """Test that only one of two writers holding the same revision wins."""
+        other = Post.objects.get(pk=self.post.pk)
+        self.assertTrue(self.post.bump_revision(1))
+        self.assertFalse(other.bump_revision(1))
+        self.assertEqual(self.post.revision, 2)
+
+
+class PostDetailCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        self.post = Post.objects.create(
+            title="Test Post", content="Test content", author=self.test_author
+        )
+        self.url = reverse("post-detail", args=[self.post.id])
+
+    def test_detail_is_cached_until_a_comment(self):
+        """Test that repeated reads are served from the cache until a write."""
+        self.assertEqual(self.client.get(self.url).data["comments"], [])
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["ETag"], '"1"')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Comment.objects.create(post=self.post, content="New comment")
+        comments = self.client.get(self.url).data["comments"]
+        self.assertEqual([comment["content"] for comment in comments], ["New comment"])
+
+    def test_author_rename_invalidates_details(self):
+        """Test that renaming an author refreshes the details of their posts."""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.test_author.name = "Renamed Author"
+                self.test_author.save()
+        self.assertEqual(
+            self.client.get(self.url).data["author_name"], "Renamed Author"
+        )
+
+    def test_invalidation_during_a_rebuild_discards_its_result(self):
+        """Test that a detail built before a write's invalidation is not stored."""
+
+        def build():
+            detail = {"data": {"title": "Test Post"}, "etag": None}
+            # A write commits after the build read the database.
+            with self.captureOnCommitCallbacks(execute=True):
+                detail_cache.invalidate(self.post.id)
+            return detail
+
+        self.assertEqual(
+            detail_cache.get_detail(self.post.id, build)["data"],
+            {"title": "Test Post"},
+        )
+        self.assertIsNone(cache.get(detail_cache.cache_key(self.post.id)))
+
+        self.client.get(self.url)
+        self.assertIsNotNone(cache.get(detail_cache.cache_key(self.post.id)))
+
+    def test_concurrent_misses_build_once(self):
+        """Test that simultaneous misses in a worker share one rebuild."""
+        builds = []
+        results = []
+
+        def build():
+            builds.append(1)
+            threading.Event().wait(0.1)
+            return {"data": {"id": 1}, "etag": None}
+
+        def read():
+            results.append(detail_cache.get_detail(1, build))
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(results, [{"data": {"id": 1}, "etag": None}] * 8)
+
+    def test_stale_detail_is_served_while_another_worker_rebuilds(self):
+        """Test that a stale entry is served while its lock is held elsewhere."""
+        stale = {"data": {"id": 1}, "etag": None}
+        cache.set(detail_cache.cache_key(1), {"detail": stale, "fresh_until": 0})
+        cache.add(detail_cache.lock_key(1), True)
+
+        def fail():
+            raise AssertionError("Rebuilt while locked.")
+
+        self.assertEqual(detail_cache.get_detail(1, fail), stale)
+        cache.delete(detail_cache.lock_key(1))
+        fresh = {"data": {"id": 1, "title": "New"}, "etag": None}
+        self.assertEqual(detail_cache.get_detail(1, lambda: fresh), fresh)
+        self.assertEqual(detail_cache.get_detail(1, fail), fresh)
+
+
 class CommentCreateEndpointTests(APITestCase):
     def setUp(self):
         # Create test user and author
@@ -464,3 +955,551 @@ class CommentCreateEndpointTests(APITestCase):
         )
         self.assertEqual(response.status_code, 201)
         self.assertEqual(Comment.objects.filter(post=self.post).count(), 1)
+
+
+class ArchivePostsTests(APITestCase):
+    def setUp(self):
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        self.live_post = Post.objects.create(
+            title="Live Post", content="Live", author=self.test_author, active=True
+        )
+        self.inactive_post = Post.objects.create(
+            title="Inactive Post",
+            content="Inactive",
+            author=self.test_author,
+            active=False,
+        )
+        self.old_post = Post.objects.create(
+            title="Old Post",
+            content="Old",
+            author=self.test_author,
+            active=True,
+            published_date=timezone.now() - timezone.timedelta(days=400),
+        )
+        Comment.objects.create(post=self.inactive_post, content="Archived comment")
+        Comment.objects.create(post=self.live_post, content="Live comment")
+
+    def test_archive_moves_inactive_and_old_posts(self):
+        """Test that the command moves inactive and old posts with their comments."""
+        call_command("archive_posts", "--older-than-days=365", stdout=StringIO())
+        self.assertEqual(list(Post.objects.all()), [self.live_post])
+        self.assertEqual(
+            set(ArchivedPost.objects.values_list("id", flat=True)),
+            {self.inactive_post.id, self.old_post.id},
+        )
+        self.assertEqual(ArchivedComment.objects.get().post_id, self.inactive_post.id)
+        self.assertEqual(Comment.objects.get().post_id, self.live_post.id)
+
+    def test_retrieve_archived_post(self):
+        """Test that an archived post is still served with its comments."""
+        call_command("archive_posts", stdout=StringIO())
+        response = self.client.get(reverse("post-detail", args=[self.inactive_post.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["title"], "Inactive Post")
+        self.assertEqual(
+            [comment["content"] for comment in response.data["comments"]],
+            ["Archived comment"],
+        )
+
+    def test_inactive_list_includes_archived_posts(self):
+        """Test that listing inactive posts covers live and archived ones."""
+        call_command("archive_posts", stdout=StringIO())
+        Post.objects.create(
+            title="Another Inactive Post",
+            content="Inactive",
+            author=self.test_author,
+            active=False,
+        )
+        response = self.client.get(reverse("post-list"), {"active": "false"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(
+            [post["title"] for post in response.data["results"]],
+            ["Another Inactive Post", "Inactive Post"],
+        )
+
+    def test_archived_posts_keep_histogram_counts(self):
+        """Test that archiving and rebuilding leave the histogram unchanged."""
+        url = reverse("post-histogram")
+
+        def buckets(**params):
+            return [
+                row["count"] for row in self.client.get(url, params).data["buckets"]
+            ]
+
+        before = (buckets(), buckets(active="false"))
+        call_command("archive_posts", "--older-than-days=365", stdout=StringIO())
+        self.assertEqual((buckets(), buckets(active="false")), before)
+        self.assertEqual(buckets(active="false"), [1])
+
+        call_command("rebuild_post_histogram", stdout=StringIO())
+        self.assertEqual((buckets(), buckets(active="false")), before)
+
+    def test_archived_posts_keep_author_stats(self):
+        """Test that archiving and rebuilding leave author stats unchanged."""
+        url = reverse("author_stats", args=[self.test_author.id])
+
+        def stats():
+            cache.clear()
+            data = self.client.get(url).data
+            return {key: value for key, value in data.items() if key != "updated_at"}
+
+        before = stats()
+        self.assertEqual(before["comments_received"], 2)
+        call_command("archive_posts", "--older-than-days=365", stdout=StringIO())
+        self.assertEqual(stats(), before)
+
+        AuthorStats.objects.all().delete()
+        call_command("rebuild_author_stats", stdout=StringIO())
+        self.assertEqual(stats(), before)
+
+
+class CommentPartitionTests(APITestCase):
+    def test_month_arithmetic(self):
+        """Test that partition months roll over year boundaries."""
+        month = partitions.month_start(timezone.datetime(2024, 11, 17))
+        self.assertEqual(partitions.add_months(month, 2), datetime.date(2025, 1, 1))
+        self.assertEqual(partitions.add_months(month, -11), datetime.date(2023, 12, 1))
+        self.assertEqual(partitions.partition_name(month), "blog_comment_p202411")
+
+    def test_commands_are_noops_without_partitioning(self):
+        """Test that the partition commands leave an unpartitioned table alone."""
+        out = StringIO()
+        call_command("create_comment_partitions", stdout=out)
+        call_command("drop_comment_partitions", "--older-than-months=12", stdout=out)
+        self.assertIn("not partitioned", out.getvalue())
+        self.assertEqual(partitions.ensure_partitions(), [])
+
+
+class PostHistogramTests(APITestCase):
+    def setUp(self):
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        for published_date, post_status in [
+            (timezone.datetime(2025, 1, 5, tzinfo=datetime.timezone.utc), "published"),
+            (timezone.datetime(2025, 1, 20, tzinfo=datetime.timezone.utc), "draft"),
+            (timezone.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc), "published"),
+        ]:
+            Post.objects.create(
+                title="Test Post",
+                content="Test content",
+                author=self.test_author,
+                status=post_status,
+                published_date=published_date,
+            )
+        self.url = reverse("post-histogram")
+
+    def buckets(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [(str(row["bucket"]), row["count"]) for row in response.data["buckets"]]
+
+    def test_histogram_periods_and_filters(self):
+        """Test that counts are bucketed by period and filtered by status."""
+        self.assertEqual(self.buckets(), [("2025-01-01", 2), ("2025-03-01", 1)])
+        self.assertEqual(self.buckets(period="year"), [("2025-01-01", 3)])
+        self.assertEqual(
+            self.buckets(period="day", status="published"),
+            [("2025-01-05", 1), ("2025-03-01", 1)],
+        )
+        self.assertEqual(self.buckets(active="false"), [])
+
+    def test_histogram_follows_updates_and_deletes(self):
+        """Test that the rollups move with post updates and deletes."""
+        post = Post.objects.get(published_date__month=3)
+        post.active = False
+        post.save()
+        Post.objects.filter(status="draft").delete()
+        self.assertEqual(self.buckets(), [("2025-01-01", 1)])
+        self.assertEqual(self.buckets(active="false"), [("2025-03-01", 1)])
+
+    def test_histogram_query_count_is_constant(self):
+        """Test that the histogram is one query on the rollup table."""
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_rebuild_matches_incremental_counts(self):
+        """Test that rebuilding the rollups gives the same histogram."""
+        before = self.buckets(period="day")
+        PostDateBucket.objects.all().delete()
+        call_command("rebuild_post_histogram", stdout=StringIO())
+        self.assertEqual(self.buckets(period="day"), before)
+
+    def test_invalid_period(self):
+        """Test that an unknown period is rejected."""
+        response = self.client.get(self.url, {"period": "week"})
+        self.assertEqual(response.status_code, 400)
+
+
+class AuthorStatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        self.first_post = Post.objects.create(
+            title="First Post",
+            content="Test content",
+            author=self.test_author,
+            status="published",
+            published_date=timezone.now() - timezone.timedelta(days=3),
+        )
+        self.second_post = Post.objects.create(
+            title="Second Post",
+            content="Test content",
+            author=self.test_author,
+            status="draft",
+        )
+        Comment.objects.create(post=self.first_post, content="First comment")
+        Comment.objects.create(post=self.second_post, content="Second comment")
+        self.url = reverse("author_stats", args=[self.test_author.id])
+
+    def stats(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_stats_follow_post_and_comment_writes(self):
+        """Test that the summary row tracks posts, statuses and comments."""
+        stats = self.stats()
+        self.assertEqual(stats["published_posts"], 1)
+        self.assertEqual(stats["draft_posts"], 1)
+        self.assertEqual(stats["comments_received"], 2)
+        self.assertEqual(
+            stats["latest_published_date"],
+            self.second_post.published_date.isoformat().replace("+00:00", "Z"),
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second_post.status = "published"
+            self.second_post.save()
+        self.assertEqual(self.stats()["published_posts"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second_post.delete()
+        stats = self.stats()
+        self.assertEqual(stats["published_posts"], 1)
+        self.assertEqual(stats["comments_received"], 1)
+        self.assertEqual(
+            stats["latest_published_date"],
+            self.first_post.published_date.isoformat().replace("+00:00", "Z"),
+        )
+
+    def test_stats_are_cached(self):
+        """Test that stats are one primary-key lookup, then served from cache."""
+        with self.assertNumQueries(1):
+            self.stats()
+        with self.assertNumQueries(0):
+            self.stats()
+
+    def test_rebuild_matches_incremental_stats(self):
+        """Test that the rebuild command gives the same numbers."""
+        before = self.stats()
+        AuthorStats.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_author_stats", stdout=StringIO())
+        after = self.stats()
+        self.assertEqual(
+            {key: value for key, value in after.items() if key != "updated_at"},
+            {key: value for key, value in before.items() if key != "updated_at"},
+        )
+
+    def test_unknown_author(self):
+        """Test that stats of an unknown author are a 404."""
+        response = self.client.get(reverse("author_stats", args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentStreamTests(APITestCase):
+    def setUp(self):
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        self.post = Post.objects.create(
+            title="Test Post", content="Test content", author=self.test_author
+        )
+        self.comments = [
+            Comment.objects.create(post=self.post, content=f"Comment {number}")
+            for number in range(3)
+        ]
+        self.url = reverse("comment_stream", args=[self.post.id])
+
+    def test_wsgi_stream_replays_missed_comments(self):
+        """Test that a WSGI stream sends the comments after Last-Event-ID and ends."""
+        response = self.client.get(
+            self.url, HTTP_LAST_EVENT_ID=str(self.comments[0].id)
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join(response.streaming_content).decode()
+        self.assertTrue(body.startswith("retry: "))
+        self.assertEqual(
+            [line for line in body.splitlines() if line.startswith("id: ")],
+            [f"id: {comment.id}" for comment in self.comments[1:]],
+        )
+
+    def test_wsgi_stream_without_last_event_id_sends_no_history(self):
+        """Test that a new WSGI stream only sets the id of the newest comment."""
+        response = self.client.get(self.url)
+        body = b"".join(response.streaming_content).decode()
+        self.assertEqual(
+            body,
+            f"retry: {settings.COMMENT_STREAM['RETRY_MS']}\n"
+            f"id: {self.comments[-1].id}\n\n",
+        )
+        self.assertNotIn("event: comment", body)
+
+    def test_postgres_listener_delivers_notifications(self):
+        """Test that the psycopg2 listener loop delivers notified comments."""
+
+        class StopListening(Exception):
+            pass
+
+        comment = self.comments[2]
+        payload = json.dumps({"post_id": self.post.id, "id": comment.id})
+        listener = mock.MagicMock(notifies=[])
+        listener.poll.side_effect = lambda: listener.notifies.append(
+            SimpleNamespace(payload=payload)
+        )
+        db = mock.Mock()
+        db.get_new_connection.return_value = listener
+        broker = mock.Mock()
+        broker.has_subscribers.return_value = True
+        ready = ([listener], [], [])
+        with mock.patch("blog.live.connection", db), mock.patch(
+            "blog.live.select.select", side_effect=[ready, StopListening]
+        ), mock.patch("blog.live.close_old_connections"):
+            with self.assertRaises(StopListening):
+                live.PostgresBackend(broker).listen_once()
+
+        cursor = listener.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with("LISTEN blog_comments")
+        broker.deliver.assert_called_once_with(
+            self.post.id, live.comment_message(comment)
+        )
+        self.assertEqual(listener.notifies, [])
+        listener.close.assert_called_once_with()
+
+    def test_unknown_post(self):
+        """Test that streaming an unknown post is a 404."""
+        response = self.client.get(reverse("comment_stream", args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_asgi_stream_pushes_new_comments(self):
+        """Test that an ASGI stream resumes, then pushes newly published comments."""
+        response = await self.async_client.get(
+            self.url, {"last_event_id": self.comments[1].id}
+        )
+        events = response.streaming_content
+        self.assertTrue((await anext(events)).startswith(b"retry: "))
+        self.assertIn(b"Comment 2", await anext(events))
+
+        comment = await Comment.objects.acreate(post=self.post, content="Live comment")
+        await sync_to_async(live.publish_comment)(comment)
+        event = (await asyncio.wait_for(anext(events), 5)).decode()
+        self.assertTrue(event.startswith(f"id: {comment.id}\nevent: comment\n"))
+        self.assertIn("Live comment", event)
+        await events.aclose()
+
+
+class OutboxStubHandler(BaseHTTPRequestHandler):
+    received = []
+    status = 200
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        OutboxStubHandler.received.append(json.loads(body))
+        self.send_response(OutboxStubHandler.status)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class OutboxTests(APITestCase):
+    def setUp(self):
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        self.post = Post.objects.create(
+            title="Test Post", content="Test content", author=self.test_author
+        )
+        comment = Comment.objects.create(post=self.post, content="Test comment")
+        self.post.title = "Edited"
+        self.post.save()
+        comment.delete()
+
+    def sinks(self, **sinks):
+        return override_settings(OUTBOX={**settings.OUTBOX, "SINKS": sinks})
+
+    def test_writes_record_events(self):
+        """Test that post and comment writes add outbox events in order."""
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list("topic", "event")),
+            [
+                ("post", "created"),
+                ("comment", "created"),
+                ("post", "updated"),
+                ("comment", "deleted"),
+            ],
+        )
+        self.assertEqual(OutboxEvent.objects.all()[2].payload["title"], "Edited")
+
+    def test_archival_records_archived_events(self):
+        """Test that archiving records archived rather than deleted events."""
+        Comment.objects.create(post=self.post, content="Archived comment")
+        self.post.active = False
+        self.post.save()
+        start = OutboxEvent.objects.latest("id").id
+        call_command("archive_posts", stdout=StringIO())
+        self.assertEqual(
+            set(
+                OutboxEvent.objects.filter(id__gt=start).values_list(
+                    "topic", "event", "object_id"
+                )
+            ),
+            {
+                ("post", "archived", self.post.id),
+                ("comment", "archived", ArchivedComment.objects.get().id),
+            },
+        )
+
+    def test_rolled_back_write_records_nothing(self):
+        """Test that events share the transaction of the change."""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Post.objects.create(title="Lost", content="Lost", author=self.test_author)
+            raise RuntimeError
+        self.assertEqual(OutboxEvent.objects.count(), 4)
+
+    def test_file_sink_delivers_batches_and_tracks_offset(self):
+        """Test that the file sink gets NDJSON and resumes from its offset."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "events.ndjson")
+            with self.sinks(file={"BACKEND": "blog.outbox.FileSink", "PATH": path}):
+                call_command(
+                    "dispatch_outbox", "file", "--batch-size=3", stdout=StringIO()
+                )
+                Post.objects.create(title="New", content="New", author=self.test_author)
+                call_command("dispatch_outbox", "file", stdout=StringIO())
+            with open(path) as stream:
+                events = [json.loads(line) for line in stream]
+        self.assertEqual(
+            [event["id"] for event in events],
+            list(OutboxEvent.objects.order_by("id").values_list("id", flat=True)),
+        )
+        self.assertEqual(
+            OutboxOffset.objects.get(sink="file").position, events[-1]["id"]
+        )
+
+    def test_delivery_waits_at_missing_ids(self):
+        """Test that the offset stops before a gap until its writers have ended."""
+        first, missing, *rest = OutboxEvent.objects.order_by("id")
+        # As if the transaction of the second event had not committed yet.
+        missing.delete()
+        # (xmin, xmax) per call: the writer seen running is below 105 and
+        # has ended by the last call. Each dispatch looks once more when idle.
+        snapshots = [(100, 105), (100, 105), (104, 107), (105, 110)]
+        with tempfile.TemporaryDirectory() as directory, mock.patch(
+            "blog.outbox.current_snapshot", side_effect=snapshots
+        ), mock.patch.dict(outbox._gap_horizons, clear=True):
+            path = os.path.join(directory, "events.ndjson")
+            with self.sinks(file={"BACKEND": "blog.outbox.FileSink", "PATH": path}):
+                self.assertEqual(outbox.dispatch("file"), 1)
+                self.assertEqual(outbox.dispatch("file"), 0)
+                self.assertEqual(outbox.dispatch("file"), len(rest))
+            with open(path) as stream:
+                delivered = [json.loads(line)["id"] for line in stream]
+        self.assertEqual(delivered, [first.id] + [event.id for event in rest])
+
+    def test_new_sink_checks_its_first_event(self):
+        """Test that a new sink also waits at a gap before the first event."""
+        OutboxEvent.objects.order_by("id").first().delete()
+        with mock.patch(
+            "blog.outbox.current_snapshot", return_value=(100, 105)
+        ), mock.patch.dict(outbox._gap_horizons, clear=True):
+            self.assertEqual(outbox.pending_events(0, 10), [])
+        # Without Postgres a missing id was rolled back.
+        self.assertEqual(len(outbox.pending_events(0, 10)), 3)
+
+    def test_http_sink_posts_to_stub(self):
+        """Test that the HTTP sink posts batches and retries failed ones."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), OutboxStubHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        OutboxStubHandler.received = []
+        url = f"http://127.0.0.1:{server.server_port}/events"
+
+        with self.sinks(http={"BACKEND": "blog.outbox.HTTPSink", "URL": url}):
+            OutboxStubHandler.status = 503
+            with self.assertRaises(HTTPError):
+                outbox.dispatch("http")
+            self.assertEqual(OutboxOffset.objects.get(sink="http").position, 0)
+
+            OutboxStubHandler.status = 200
+            self.assertEqual(outbox.dispatch("http", batch_size=2), 4)
+            self.assertEqual(outbox.prune(), 4)
+        self.assertEqual(
+            [len(batch["events"]) for batch in OutboxStubHandler.received], [4, 2, 2]
+        )
+
+
+class ReplayLoadCommandTests(APITestCase):
+    def setUp(self):
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        Post.objects.create(
+            title="Test Post",
+            content="This is a test post.",
+            author=self.test_author,
+            status="published",
+            active=True,
+        )
+
+    def test_replay_default_scenario_in_process(self):
+        """Test replaying the built-in scenario against the WSGI app."""
+        out = StringIO()
+        call_command(
+            "replay_load",
+            "--host=testserver",
+            "--concurrency=1",
+            "--requests=60",
+            "--username=testuser",
+            "--password=testpassword",
+            "--json",
+            stdout=out,
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(
+            report["requests"],
+            60 - sum(stats["skipped"] for stats in report["endpoints"].values()),
+        )
+        for name in ("list", "retrieve", "comment_add"):
+            self.assertIn(name, report["endpoints"])
+            self.assertEqual(report["endpoints"][name]["errors"], 0)
+        self.assertEqual(
+            report["endpoints"]["list"]["histogram"]["le_inf"],
+            report["endpoints"]["list"]["requests"],
+        )
@@ -1,6 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from blog.api import PostViewSet, AddCommentAPIView, RemoveCommentAPIView
+from blog.api import (
+    PostViewSet,
+    AddCommentAPIView,
+    RemoveCommentAPIView,
+    AuthorStatsAPIView,
+    CommentStreamView,
+)
 
 router = DefaultRouter()
 router.register(r"posts", PostViewSet, basename="post")
@@ -11,9 +17,20 @@ urlpatterns = [
     path(
         "posts/<int:post_id>/comments/", AddCommentAPIView.as_view(), name="add_comment"
     ),
+    path(
+        "posts/<int:post_id>/comments/stream/",
+        CommentStreamView.as_view(),
+        name="comment_stream",
+    ),
     path(
         "posts/<int:post_id>/comments/<int:comment_id>/",
         RemoveCommentAPIView.as_view(),
         name="delete_comment",
     ),
+    # author
+    path(
+        "authors/<int:author_id>/stats/",
+        AuthorStatsAPIView.as_view(),
+        name="author_stats",
+    ),
 ]
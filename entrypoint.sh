@@ -1,6 +1,8 @@
 #!/bin/bash
 python manage.py collectstatic --no-input
+python manage.py generate_schema
 python manage.py migrate
+python manage.py create_comment_partitions
 
 if [ "$DJANGO_SUPERUSER_USERNAME" ] && [ "$DJANGO_SUPERUSER_EMAIL" ] && [ "$DJANGO_SUPERUSER_PASSWORD" ]; then
   python manage.py createsuperuser --no-input \
@@ -8,6 +10,18 @@ if [ "$DJANGO_SUPERUSER_USERNAME" ] && [ "$DJANGO_SUPERUSER_EMAIL" ] && [ "$DJAN
     --email "$DJANGO_SUPERUSER_EMAIL"
 fi
 
+# Shared directory for per-worker Prometheus samples, reset on every start.
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 export WORKERS=${SERVER_WORKERS:-3}
 export TIMEOUT=${WORKER_TIMEOUT:-180}
-exec gunicorn server.wsgi --workers=$WORKERS --timeout $TIMEOUT --bind 0.0.0.0:8000 --access-logfile -
+# SERVER_ASGI=True serves server.asgi with uvicorn workers, which can hold
+# many long-lived comment streams per worker.
+if [ "$SERVER_ASGI" = "True" ]; then
+  APP="server.asgi --worker-class uvicorn_worker.UvicornWorker"
+else
+  APP="server.wsgi"
+fi
+exec gunicorn $APP --workers=$WORKERS --timeout $TIMEOUT --bind 0.0.0.0:8000 --access-logfile -
@@ -0,0 +1,34 @@
+# Loaded automatically by gunicorn from the working directory.
+import gc
+import os
+
+# Import the app once in the master so workers share its memory pages
+# copy-on-write. Set GUNICORN_PRELOAD=False to import it in every worker.
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+
+
+def when_ready(server):
+    """
+    Finish the lazy parts of startup in the master before workers fork.
+    """
+    if not preload_app:
+        return
+    from django.db import connections
+    from django.urls import get_resolver
+
+    # Import the URLconf and every view module it references.
+    get_resolver().reverse_dict
+    # Connections must not be shared with forked workers.
+    connections.close_all()
+    # Move everything allocated so far into the permanent generation, so
+    # garbage collections in the workers do not write to the shared pages.
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    """
+    Drop the live metrics of a worker that exited.
+    """
+    from server.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
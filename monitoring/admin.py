@@ -0,0 +1,68 @@
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .models import RequestProfile, SlowQuery
+from .profiling import summarize
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ("created", "duration_ms", "view", "fingerprint")
+    list_filter = ("view", "created")
+    search_fields = ("fingerprint", "sql")
+    readonly_fields = [field.name for field in SlowQuery._meta.fields]
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "created",
+        "method",
+        "path",
+        "status",
+        "duration_ms",
+        "request_id",
+        "download",
+    )
+    list_filter = ("view", "created")
+    search_fields = ("request_id", "path")
+    exclude = ("stats",)
+    readonly_fields = [
+        field.name for field in RequestProfile._meta.fields if field.name != "stats"
+    ] + ["summary"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="monitoring_requestprofile_download",
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        """
+        Serve the stored stats as a ``.prof`` file for pstats or snakeviz.
+        """
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(
+            bytes(profile.stats), content_type="application/octet-stream"
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="{profile.request_id}.prof"'
+        return response
+
+    @admin.display(description="Profile")
+    def download(self, obj):
+        url = reverse("admin:monitoring_requestprofile_download", args=[obj.pk])
+        return format_html('<a href="{}">.prof</a>', url)
+
+    @admin.display(description="Top functions")
+    def summary(self, obj):
+        return format_html("<pre>{}</pre>", summarize(bytes(obj.stats)))
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from monitoring.profiling import make_profile_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile header value for profiling a request."
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_profile_token())
+        self.stderr.write(
+            f"Valid for {settings.PROFILING['TOKEN_MAX_AGE']} seconds. Send it as "
+            "'X-Profile: <token>'; the response carries X-Profile-Id."
+        )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Sum
+
+from monitoring.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = "Summarize recorded slow queries grouped by normalized fingerprint."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit", type=int, default=20, help="Number of fingerprints to show."
+        )
+        parser.add_argument(
+            "--order",
+            choices=["total", "count", "max"],
+            default="total",
+            help="Sort by total time, number of occurrences or slowest run.",
+        )
+        parser.add_argument(
+            "--plans", action="store_true", help="Show the latest plan per group."
+        )
+
+    def handle(self, *args, **options):
+        order = {"total": "-total_ms", "count": "-count", "max": "-max_ms"}
+        groups = (
+            SlowQuery.objects.values("fingerprint")
+            .annotate(
+                count=Count("id"),
+                total_ms=Sum("duration_ms"),
+                avg_ms=Avg("duration_ms"),
+                max_ms=Max("duration_ms"),
+                latest_id=Max("id"),
+            )
+            .order_by(order[options["order"]])[: options["limit"]]
+        )
+        latest = SlowQuery.objects.in_bulk([group["latest_id"] for group in groups])
+
+        for group in groups:
+            sample = latest[group["latest_id"]]
+            self.stdout.write(
+                f"{group['fingerprint']}  count={group['count']} "
+                f"total={group['total_ms']:.1f}ms avg={group['avg_ms']:.1f}ms "
+                f"max={group['max_ms']:.1f}ms view={sample.view}"
+            )
+            self.stdout.write(f"  {sample.normalized_sql}")
+            if options["plans"] and sample.plan:
+                for line in sample.plan.splitlines():
+                    self.stdout.write(f"    {line}")
@@ -0,0 +1,69 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from monitoring.profiling import has_valid_token, profile_request
+from monitoring.slow_queries import SlowQueryRecorder
+
+logger = logging.getLogger("monitoring.slow_queries")
+
+
+class SlowQueryMiddleware:
+    """
+    Record queries slower than ``SLOW_QUERY["THRESHOLD_MS"]`` made while
+    handling a request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SLOW_QUERY["ENABLED"]:
+            return self.get_response(request)
+
+        recorder = SlowQueryRecorder(view=request.path)
+        request.slow_query_recorder = recorder
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        try:
+            recorder.flush()
+        except DatabaseError:
+            logger.exception("Could not store slow queries.")
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        recorder = getattr(request, "slow_query_recorder", None)
+        if recorder is not None:
+            recorder.view = request.resolver_match.view_name
+
+
+class ProfilingMiddleware:
+    """
+    Profile a single request under cProfile when it carries a signed
+    ``X-Profile`` header, or ``?profile=1`` from a logged-in staff user.
+    Other requests only pay for two dictionary lookups.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        token = request.META.get("HTTP_X_PROFILE")
+        if token is not None:
+            return has_valid_token(token)
+        if "profile=" in request.META.get("QUERY_STRING", ""):
+            user = getattr(request, "user", None)
+            return (
+                request.GET.get("profile") == "1" and user is not None and user.is_staff
+            )
+        return False
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        return profile_request(self.get_response, request)
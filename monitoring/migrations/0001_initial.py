@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="SlowQuery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fingerprint", models.CharField(db_index=True, max_length=32)),
+                ("normalized_sql", models.TextField()),
+                ("sql", models.TextField()),
+                ("params", models.JSONField(default=list)),
+                ("duration_ms", models.FloatField()),
+                ("view", models.CharField(blank=True, max_length=200)),
+                ("stack", models.TextField(blank=True)),
+                ("plan", models.TextField(blank=True)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name_plural": "slow queries",
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import models
+
+
+class SlowQuery(models.Model):
+    fingerprint = models.CharField(max_length=32, db_index=True)
+    normalized_sql = models.TextField()
+    sql = models.TextField()
+    params = models.JSONField(default=list)
+    duration_ms = models.FloatField()
+    view = models.CharField(max_length=200, blank=True)
+    stack = models.TextField(blank=True)
+    plan = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "slow queries"
+
+    def __str__(self):
+        return f"{self.duration_ms:.1f} ms {self.view}"
+
+
+class RequestProfile(models.Model):
+    request_id = models.UUIDField(unique=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view = models.CharField(max_length=200, blank=True)
+    status = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    stats = models.BinaryField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.request_id})"
@@ -0,0 +1,89 @@
+"""
+On-demand cProfile runs for single requests, stored as pstats data.
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+
+SIGNING_SALT = "monitoring.profiling"
+
+
+def make_profile_token():
+    """
+    Return a value for the ``X-Profile`` header, valid for
+    ``PROFILING["TOKEN_MAX_AGE"]`` seconds.
+    """
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign("profile")
+
+
+def has_valid_token(value):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            value, max_age=settings.PROFILING["TOKEN_MAX_AGE"]
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def profile_request(get_response, request):
+    """
+    Run the rest of the request under cProfile and store the result.
+    """
+    from monitoring.models import RequestProfile
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    response = profiler.runcall(get_response, request)
+    duration = time.perf_counter() - started
+
+    profiler.create_stats()
+    match = getattr(request, "resolver_match", None)
+    profile = RequestProfile.objects.create(
+        request_id=uuid.uuid4(),
+        method=request.method,
+        path=request.path[:500],
+        view=match.view_name if match else "",
+        status=response.status_code,
+        duration_ms=duration * 1000,
+        stats=marshal.dumps(profiler.stats),
+    )
+    cutoff = (
+        RequestProfile.objects.order_by("-id")
+        .values_list("id", flat=True)[settings.PROFILING["MAX_PROFILES"] :]
+        .first()
+    )
+    if cutoff is not None:
+        RequestProfile.objects.filter(id__lte=cutoff).delete()
+
+    response["X-Profile-Id"] = str(profile.request_id)
+    return response
+
+
+class StoredStats:
+    """
+    Adapter that lets ``pstats.Stats`` load stats kept in memory.
+    """
+
+    def __init__(self, stats_data):
+        self.stats = marshal.loads(stats_data)
+
+    def create_stats(self):
+        pass
+
+
+def summarize(stats_data, limit=30):
+    """
+    Text report of the most expensive functions by cumulative time.
+    """
+    output = io.StringIO()
+    stats = pstats.Stats(StoredStats(stats_data), stream=output)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return output.getvalue()
@@ -0,0 +1,153 @@
+"""
+Capture ORM queries slower than ``SLOW_QUERY["THRESHOLD_MS"]`` together with
+their parameters, originating view, a short stack summary and an EXPLAIN
+plan.
+"""
+
+import hashlib
+import logging
+import re
+import time
+import traceback
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger("monitoring.slow_queries")
+
+# Most recent slow queries seen by this process.
+recent_slow_queries = deque(maxlen=settings.SLOW_QUERY["BUFFER_SIZE"])
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """
+    Replace literals and placeholders with ``?`` so queries that only differ
+    in their values share a fingerprint.
+    """
+    normalized = _STRING_LITERAL.sub("?", sql)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = normalized.replace("%s", "?")
+    normalized = _VALUE_LIST.sub("(?+)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode()).hexdigest()
+
+
+def stack_summary(limit=8):
+    """
+    The innermost project frames that led to the query.
+    """
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and "site-packages" not in frame.filename
+        and not frame.filename.endswith(("slow_queries.py", "middleware.py"))
+    ]
+    return "\n".join(
+        f"{frame.filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}"
+        for frame in frames[-limit:]
+    )
+
+
+def explain(connection, sql, params):
+    """
+    Return the query plan for a SELECT, or an empty string.
+    """
+    if connection.vendor == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif connection.vendor == "postgresql" and settings.SLOW_QUERY["EXPLAIN_ANALYZE"]:
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+    else:
+        prefix = "EXPLAIN "
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+
+class SlowQueryRecorder:
+    """
+    ``connection.execute_wrapper`` hook for one request. Slow queries are
+    logged immediately and kept in ``pending`` until ``flush`` stores them.
+    """
+
+    def __init__(self, view=""):
+        self.view = view
+        self.threshold = settings.SLOW_QUERY["THRESHOLD_MS"] / 1000
+        self.pending = []
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if duration >= self.threshold:
+            self.record(context["connection"], sql, params, many, duration)
+        return result
+
+    def record(self, connection, sql, params, many, duration):
+        normalized = normalize_sql(sql)
+        entry = {
+            "fingerprint": fingerprint(normalized),
+            "normalized_sql": normalized,
+            "sql": sql,
+            "params": [] if many else [str(param) for param in params or ()],
+            "duration_ms": duration * 1000,
+            "view": self.view,
+            "stack": stack_summary(),
+            "plan": "",
+        }
+        if (
+            settings.SLOW_QUERY["EXPLAIN"]
+            and not many
+            and sql.lstrip()[:6].upper() == "SELECT"
+        ):
+            self.explaining = True
+            try:
+                # In a savepoint: on Postgres a failed statement would
+                # otherwise abort the request's transaction.
+                with transaction.atomic(using=connection.alias):
+                    entry["plan"] = explain(connection, sql, params)
+            except Exception as exc:
+                entry["plan"] = f"EXPLAIN failed: {exc}"
+            finally:
+                self.explaining = False
+
+        recent_slow_queries.append(entry)
+        self.pending.append(entry)
+        logger.warning(
+            "Slow query (%.1f ms) in %s: %s",
+            entry["duration_ms"],
+            self.view,
+            normalized,
+            extra={"slow_query": entry},
+        )
+
+    def flush(self):
+        """
+        Store pending entries and trim the table to ``MAX_ROWS``.
+        """
+        if not self.pending:
+            return
+        from monitoring.models import SlowQuery
+
+        SlowQuery.objects.bulk_create(SlowQuery(**entry) for entry in self.pending)
+        self.pending = []
+        cutoff = (
+            SlowQuery.objects.order_by("-id")
+            .values_list("id", flat=True)[settings.SLOW_QUERY["MAX_ROWS"] :]
+            .first()
+        )
+        if cutoff is not None:
+            SlowQuery.objects.filter(id__lte=cutoff).delete()
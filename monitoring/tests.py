@@ -0,0 +1,138 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from blog.models import Author, Post
+from monitoring.models import RequestProfile, SlowQuery
+from monitoring.profiling import make_profile_token
+from monitoring.slow_queries import SlowQueryRecorder, normalize_sql
+
+RECORD_ALL_QUERIES = {
+    "ENABLED": True,
+    "THRESHOLD_MS": 0,
+    "EXPLAIN": True,
+    "EXPLAIN_ANALYZE": False,
+    "BUFFER_SIZE": 100,
+    "MAX_ROWS": 5,
+}
+
+
+class NormalizeSqlTests(TestCase):
+    def test_literals_and_placeholders_are_replaced(self):
+        """Test that queries differing only in values normalize the same."""
+        first = normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'a'")
+        second = normalize_sql("SELECT *  FROM t WHERE id IN (%s, %s) AND name = %s")
+        self.assertEqual(first, "SELECT * FROM t WHERE id IN (?+) AND name = ?")
+        self.assertEqual(first, second)
+
+
+@override_settings(SLOW_QUERY=RECORD_ALL_QUERIES)
+class SlowQueryRecorderTests(APITestCase):
+    def setUp(self):
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        Post.objects.create(
+            title="Test Post",
+            content="This is a test post.",
+            author=self.test_author,
+            status="published",
+            active=True,
+        )
+
+    def test_slow_queries_are_stored_with_plan(self):
+        """Test that queries over the threshold are stored with a plan."""
+        with self.assertLogs("monitoring.slow_queries", level="WARNING"):
+            response = self.client.get(reverse("post-list"), {"title": "test"})
+        self.assertEqual(response.status_code, 200)
+        entry = SlowQuery.objects.filter(sql__contains="LIKE").first()
+        self.assertIsNotNone(entry)
+        self.assertEqual(entry.view, "post-list")
+        self.assertIn("%test%", entry.params)
+        self.assertNotEqual(entry.plan, "")
+        self.assertIn("blog/api.py", entry.stack)
+
+    def test_table_is_trimmed_and_summarized(self):
+        """Test that the table stays bounded and the command groups entries."""
+        with self.assertLogs("monitoring.slow_queries", level="WARNING"):
+            for _ in range(3):
+                self.client.get(reverse("post-list"))
+        self.assertLessEqual(SlowQuery.objects.count(), 5)
+
+        out = StringIO()
+        call_command("slow_queries", "--plans", stdout=out)
+        fingerprint = SlowQuery.objects.latest("id").fingerprint
+        self.assertIn(fingerprint, out.getvalue())
+
+    def test_failed_explain_is_contained_in_a_savepoint(self):
+        """Test that EXPLAIN runs in its own savepoint and failures are kept."""
+        depth = len(connection.savepoint_ids)
+        savepoints = []
+
+        def failing_explain(connection, sql, params):
+            savepoints.append(len(connection.savepoint_ids))
+            raise DatabaseError("syntax error")
+
+        recorder = SlowQueryRecorder(view="test")
+        with mock.patch(
+            "monitoring.slow_queries.explain", failing_explain
+        ), self.assertLogs("monitoring.slow_queries", level="WARNING"):
+            recorder.record(connection, "SELECT 1", [], False, 1.0)
+        self.assertEqual(savepoints, [depth + 1])
+        self.assertEqual(recorder.pending[0]["plan"], "EXPLAIN failed: syntax error")
+        self.assertFalse(connection.needs_rollback)
+        self.assertTrue(Post.objects.exists())
+
+
+class ProfilingMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.staff_user = User.objects.create_user(
+            username="staffuser",
+            email="staffuser@example.com",
+            password="testpassword",
+            is_staff=True,
+            is_superuser=True,
+        )
+
+    def test_requests_are_not_profiled_by_default(self):
+        """Test that requests without a trigger are not profiled."""
+        response = self.client.get(reverse("post-list"), {"profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        response = self.client.get(reverse("post-list"), HTTP_X_PROFILE="forged")
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(RequestProfile.objects.count(), 0)
+
+    def test_signed_header_profiles_request(self):
+        """Test that a signed X-Profile header stores a profile."""
+        response = self.client.get(
+            reverse("post-list"), HTTP_X_PROFILE=make_profile_token()
+        )
+        profile = RequestProfile.objects.get(request_id=response["X-Profile-Id"])
+        self.assertEqual(profile.view, "post-list")
+        self.assertEqual(profile.status, 200)
+
+    def test_staff_query_flag_profiles_and_downloads(self):
+        """Test that staff can profile with ?profile=1 and download the stats."""
+        self.client.login(username="staffuser", password="testpassword")
+        response = self.client.get(reverse("post-list"), {"profile": "1"})
+        profile = RequestProfile.objects.get(request_id=response["X-Profile-Id"])
+
+        response = self.client.get(
+            reverse("admin:monitoring_requestprofile_download", args=[profile.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, bytes(profile.stats))
+        response = self.client.get(
+            reverse("admin:monitoring_requestprofile_change", args=[profile.pk])
+        )
+        self.assertContains(response, "cumulative")
@@ -0,0 +1,127 @@
+"""
+Admission control per route class for ``AdmissionMiddleware``.
+
+Every request is put in a route class: ``auth`` for the token endpoints,
+``write`` for other unsafe methods, ``search`` for post lists filtered by
+text, ``read`` for the remaining blog reads, and ``default`` for the rest.
+A class listed in ``ADMISSION["CLASSES"]`` may run at most ``LIMIT``
+requests at a time across all workers of the server; a request waits up
+to ``QUEUE_TIMEOUT`` seconds for a free slot and is then shed with
+``503``, so one slow kind of request cannot occupy every worker.
+Sub-requests of ``/api/batch/`` are admitted one by one in
+``server.batch``; the batch itself is not limited.
+
+A slot is an exclusive ``flock`` on one of ``LIMIT`` files in
+``ADMISSION["LOCK_DIR"]``. The kernel releases it when the descriptor is
+closed or the worker dies, so a crashed request never leaks its slot.
+"""
+
+import fcntl
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from server import metrics
+
+POLL_INTERVAL = 0.01
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+AUTH_VIEWS = {"login", "logout", "verify_token", "refresh_token"}
+READ_VIEWS = {
+    "post-list",
+    "post-detail",
+    "post-batch",
+    "post-histogram",
+    "author_stats",
+}
+# Post list filters that run ``icontains`` scans.
+SEARCH_PARAMS = {"title", "content", "author_name"}
+BUSY_MESSAGE = "Server is busy, retry later."
+
+
+class Full(Exception):
+    pass
+
+
+def classify(request):
+    """
+    Return the route class of ``request`` and its URL match, if any.
+    """
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return "default", None
+    if match.url_name in AUTH_VIEWS:
+        return "auth", match
+    if match.url_name == "batch":
+        return "default", match
+    # The post multi-get also takes its ids in a POST body.
+    if request.method not in SAFE_METHODS and match.url_name != "post-batch":
+        return "write", match
+    if match.url_name == "post-list" and SEARCH_PARAMS & request.GET.keys():
+        return "search", match
+    if match.url_name in READ_VIEWS:
+        return "read", match
+    return "default", match
+
+
+def try_slot(route_class, index):
+    path = os.path.join(settings.ADMISSION["LOCK_DIR"], f"{route_class}.{index}")
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def acquire(route_class, limit, timeout):
+    """
+    Take one of the ``limit`` slots of ``route_class`` and return its
+    descriptor, or None if none freed up within ``timeout`` seconds.
+    """
+    os.makedirs(settings.ADMISSION["LOCK_DIR"], exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        # Start at a random slot so waiters do not all contend for slot 0.
+        start = random.randrange(limit)
+        for offset in range(limit):
+            fd = try_slot(route_class, (start + offset) % limit)
+            if fd is not None:
+                return fd
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(POLL_INTERVAL)
+
+
+def release(fd):
+    os.close(fd)
+
+
+@contextmanager
+def admit(route_class):
+    """
+    Hold a slot of ``route_class`` while the block runs, or raise ``Full``
+    when none frees up within its queue timeout. Classes without a limit
+    are admitted at once.
+    """
+    config = settings.ADMISSION
+    limits = config["CLASSES"].get(route_class)
+    if not config["ENABLED"] or not limits or not limits["LIMIT"]:
+        yield
+        return
+    slot = acquire(route_class, limits["LIMIT"], limits["QUEUE_TIMEOUT"])
+    if slot is None:
+        metrics.ADMISSION_SHED.labels(route_class=route_class).inc()
+        raise Full
+    in_flight = metrics.ADMISSION_IN_FLIGHT.labels(route_class=route_class)
+    in_flight.inc()
+    try:
+        yield
+    finally:
+        in_flight.dec()
+        release(slot)
@@ -1,63 +1,106 @@
 from rest_framework import status
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.http import HttpResponse
-from django.shortcuts import render
+from django.views import View
+from server import batch
+from server.metrics import render_metrics
 
 
-class LandingPageView(APIView):
+class HealthCheckView(APIView):
     """
-    A simple landing page with 2 buttons:
-    - One to view the API documentation
-    - One to view the blog
+    A simple health check endpoint to verify that the server is running.
     """
 
     @swagger_auto_schema(
-        operation_description="Landing page with buttons to view API documentation and blog",
+        operation_description="Check the health of the server",
         responses={
             200: openapi.Schema(
                 type=openapi.TYPE_OBJECT,
                 properties={
-                    "message": openapi.Schema(
+                    "status": openapi.Schema(
                         type=openapi.TYPE_STRING,
-                        description="Landing page message",
+                        description="Health status of the server",
                     )
                 },
             )
         },
-        tags=["Landing Page"],
+        tags=["Health Check"],
     )
     def get(self, request):
         """
-        Renders the landing page using the landingPage.html template.
+        Returns a 200 OK response to indicate that the server is healthy.
         """
-        return render(request, "landingPage.html")
+        return Response({"status": "ok"}, status=status.HTTP_200_OK)
 
 
-class HealthCheckView(APIView):
+class MetricsView(View):
     """
-    A simple health check endpoint to verify that the server is running.
+    Prometheus scrape endpoint in text exposition format.
+
+    A plain Django view so scrapes skip DRF authentication, content
+    negotiation and rendering.
+    """
+
+    def get(self, request):
+        """
+        Returns metrics aggregated across all worker processes.
+        """
+        content, content_type = render_metrics()
+        return HttpResponse(content, content_type=content_type)
+
+
+class BatchView(APIView):
     """
+    Run several API requests in one round trip, see ``server.batch``.
+    """
+
+    permission_classes = [AllowAny]
+    batchable = False
 
     @swagger_auto_schema(
-        operation_description="Check the health of the server",
-        responses={
-            200: openapi.Schema(
-                type=openapi.TYPE_OBJECT,
-                properties={
-                    "status": openapi.Schema(
-                        type=openapi.TYPE_STRING,
-                        description="Health status of the server",
-                    )
-                },
-            )
-        },
-        tags=["Health Check"],
+        operation_summary="Run several API requests at once",
+        operation_description="Each sub-request is dispatched to its view "
+        "in-process with the caller's credentials. Results come back in "
+        "order with their own status, headers and body.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=["requests"],
+            properties={
+                "requests": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        required=["path"],
+                        properties={
+                            "method": openapi.Schema(type=openapi.TYPE_STRING),
+                            "path": openapi.Schema(type=openapi.TYPE_STRING),
+                            "body": openapi.Schema(type=openapi.TYPE_OBJECT),
+                            "headers": openapi.Schema(type=openapi.TYPE_OBJECT),
+                        },
+                    ),
+                ),
+                "concurrent": openapi.Schema(
+                    type=openapi.TYPE_BOOLEAN,
+                    description="Run consecutive reads in parallel",
+                ),
+            },
+        ),
+        responses={200: "One result per sub-request.", 400: "Bad request."},
+        tags=["Batch"],
     )
-    def get(self, request):
+    def post(self, request):
         """
-        Returns a 200 OK response to indicate that the server is healthy.
+        Dispatch the sub-requests and return their results.
         """
-        return Response({"status": "ok"}, status=status.HTTP_200_OK)
+        try:
+            items = batch.parse_items(request.data)
+        except batch.InvalidBatch as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        results = batch.dispatch(
+            request, items, concurrent=request.data.get("concurrent") is True
+        )
+        return Response({"results": results}, status=status.HTTP_200_OK)
@@ -4,6 +4,7 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework.response import Response
 from drf_yasg import openapi
 from django.utils import timezone
+from django.conf import settings
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 from rest_framework_simplejwt.token_blacklist.models import (
@@ -13,6 +14,8 @@ from rest_framework_simplejwt.token_blacklist.models import (
 from django.contrib.auth.models import User
 from rest_framework.permissions import AllowAny
 
+from server.auth.passwords import Overloaded
+
 
 class Login(APIView):
     """
@@ -50,6 +53,7 @@ class Login(APIView):
             400: "Bad request.",
             401: "Unauthorized.",
             500: "Internal server error.",
+            503: "Too many logins in progress, retry later.",
         },
         tags=["Auth"],
         operation_description="This endpoint allows users to log in with their username and password and receive a JWT token.",
@@ -69,7 +73,14 @@ class Login(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        user = authenticate(username=username, password=password)
+        try:
+            user = authenticate(request, username=username, password=password)
+        except Overloaded:
+            return Response(
+                {"error": "Too many logins in progress, retry later"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(settings.PASSWORD_HASHING["RETRY_AFTER"])},
+            )
         if user is None:
             return Response(
                 {"error": "Invalid username or password"},
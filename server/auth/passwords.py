@@ -0,0 +1,70 @@
+"""
+Password verification with a server-wide bound on concurrent hashing.
+
+Hashing a password is deliberately slow, so a burst of logins can keep
+every worker busy hashing. ``PasswordBackend``, the authentication backend
+of ``AUTHENTICATION_BACKENDS``, checks credentials as Django's
+``ModelBackend`` does, but only while holding one of
+``PASSWORD_HASHING["CONCURRENCY"]`` slots shared by all workers of the
+server (``flock`` slots, see ``server.admission``). At most ``QUEUE_DEPTH``
+more logins may wait for a slot, each for up to ``TIMEOUT`` seconds; any
+other login raises ``Overloaded`` out of ``django.contrib.auth.authenticate``
+and is answered with ``503``, so the remaining workers keep serving other
+requests.
+
+A password stored with an older hasher than the first of
+``PASSWORD_HASHERS`` is rehashed with it on the next successful login,
+within the same slot.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+
+from server import admission
+
+HASHING_SLOTS = "password-hashing"
+QUEUE_SLOTS = "password-queue"
+
+
+class Overloaded(Exception):
+    pass
+
+
+def acquire_hashing_slot():
+    config = settings.PASSWORD_HASHING
+    slot = admission.acquire(HASHING_SLOTS, config["CONCURRENCY"], 0)
+    if slot is not None or not config["QUEUE_DEPTH"]:
+        return slot
+    place = admission.acquire(QUEUE_SLOTS, config["QUEUE_DEPTH"], 0)
+    if place is None:
+        return None
+    try:
+        return admission.acquire(
+            HASHING_SLOTS, config["CONCURRENCY"], config["TIMEOUT"]
+        )
+    finally:
+        admission.release(place)
+
+
+def run(function, *args, **kwargs):
+    """
+    Call ``function`` while holding a hashing slot, or raise ``Overloaded``
+    when none is free in time.
+    """
+    slot = acquire_hashing_slot()
+    if slot is None:
+        raise Overloaded
+    try:
+        return function(*args, **kwargs)
+    finally:
+        admission.release(slot)
+
+
+class PasswordBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if password is None:
+            return None
+        # ModelBackend hashes once to check the password, or once for an
+        # unknown user so it takes as long, and once more to upgrade an
+        # older hash; all of it runs in one slot.
+        return run(super().authenticate, request, username, password, **kwargs)
@@ -0,0 +1,200 @@
+"""
+Composite requests: several API calls in one round trip.
+
+``POST /api/batch/`` takes ``{"requests": [{"method", "path", "body",
+"headers"}], "concurrent": false}``. Each sub-request is resolved with the
+URL resolver and handed straight to its view, skipping the middleware
+stack and, since the batch request was authenticated once, re-running
+authentication: every view sees the batch's user. Sub-requests run in
+order; with ``concurrent``, each run of consecutive reads between writes
+is spread over a small thread pool. Every item gets its own status,
+headers and body, and a failing item does not stop the others. Each
+sub-request takes a slot of its own route class (see ``server.admission``)
+and gets ``503`` when the class is full.
+"""
+
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from server import admission
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Request headers of the batch that sub-requests inherit.
+INHERITED_META = [
+    "SERVER_NAME",
+    "SERVER_PORT",
+    "REMOTE_ADDR",
+    "HTTP_HOST",
+    "HTTP_X_FORWARDED_PROTO",
+    "HTTP_USER_AGENT",
+    "HTTP_ACCEPT_LANGUAGE",
+    "wsgi.url_scheme",
+]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class InvalidBatch(ValueError):
+    pass
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BATCH["MAX_WORKERS"],
+                thread_name_prefix="batch",
+            )
+        return _executor
+
+
+def parse_items(data):
+    """
+    Validate the batch body and return its sub-requests.
+    """
+    items = data.get("requests") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise InvalidBatch("requests must be a non-empty list.")
+    if len(items) > settings.BATCH["MAX_REQUESTS"]:
+        raise InvalidBatch(
+            f"At most {settings.BATCH['MAX_REQUESTS']} requests per batch."
+        )
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            raise InvalidBatch("Every request needs a path.")
+        if not item["path"].startswith(settings.BATCH["PATH_PREFIX"]):
+            raise InvalidBatch(
+                f"Paths must start with {settings.BATCH['PATH_PREFIX']}."
+            )
+        if not isinstance(item.get("method", "GET"), str):
+            raise InvalidBatch("method must be a string.")
+        if not isinstance(item.get("headers", {}), dict):
+            raise InvalidBatch("headers must be an object.")
+    return items
+
+
+def build_request(parent, item):
+    """
+    A request for one sub-request, carrying the user of ``parent``.
+    """
+    method = item.get("method", "GET").upper()
+    url = urlsplit(item["path"])
+    body = b""
+    if item.get("body") is not None:
+        body = json.dumps(item["body"]).encode()
+    environ = {key: parent.META[key] for key in INHERITED_META if key in parent.META}
+    environ.update(
+        {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": url.path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": url.query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+    )
+    for name, value in item.get("headers", {}).items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = str(value)
+    request = WSGIRequest(environ)
+    request.user = parent.user
+    # Read by rest_framework.request.Request instead of authenticating again.
+    request._force_auth_user = parent.user
+    request._force_auth_token = parent.auth
+    return request
+
+
+def response_body(response):
+    if not response.content:
+        return None
+    if response.get("Content-Type", "").startswith("application/json"):
+        return json.loads(response.content)
+    return response.content.decode(response.charset or "utf-8", "replace")
+
+
+def call_view(request, match):
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+    except Exception as exc:
+        response = response_for_exception(request, exc)
+    return response
+
+
+def run(request):
+    """
+    Call the view of a sub-request and describe its response.
+    """
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return {"status": 404, "headers": {}, "body": {"error": "Not found."}}
+    view_class = getattr(match.func, "view_class", None)
+    if not getattr(view_class, "batchable", True) or iscoroutinefunction(match.func):
+        return {
+            "status": 400,
+            "headers": {},
+            "body": {"error": "This endpoint cannot be batched."},
+        }
+    route_class, _ = admission.classify(request)
+    try:
+        with admission.admit(route_class):
+            response = call_view(request, match)
+    except admission.Full:
+        return {
+            "status": 503,
+            "headers": {"Retry-After": str(settings.ADMISSION["RETRY_AFTER"])},
+            "body": {"error": admission.BUSY_MESSAGE},
+        }
+    if response.streaming:
+        return {
+            "status": 400,
+            "headers": {},
+            "body": {"error": "Streaming responses cannot be batched."},
+        }
+    return {
+        "status": response.status_code,
+        "headers": dict(response.headers),
+        "body": response_body(response),
+    }
+
+
+def run_in_thread(request):
+    try:
+        return run(request)
+    finally:
+        connections.close_all()
+
+
+def dispatch(parent, items, concurrent=False):
+    """
+    Run the sub-requests of a batch and return their results in order.
+    """
+    requests = [build_request(parent, item) for item in items]
+    results = []
+    start = 0
+    while start < len(requests):
+        end = start + 1
+        if concurrent and requests[start].method in READ_METHODS:
+            while end < len(requests) and requests[end].method in READ_METHODS:
+                end += 1
+        group = requests[start:end]
+        if len(group) > 1:
+            results.extend(get_executor().map(run_in_thread, group))
+        else:
+            results.append(run(group[0]))
+        start = end
+    return results
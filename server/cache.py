@@ -0,0 +1,327 @@
+"""
+Two-tier cache backend.
+
+``TwoTierCache`` keeps a small LRU in process memory (L1) in front of a
+shared cache alias (L2) that every worker reads and writes, such as
+``FileBasedCache`` or ``RedisCache``. Only keys starting with one of
+``L1_KEY_PREFIXES`` are held in L1; everything else, including locks taken
+with ``add``, goes straight to the shared tier.
+
+Writes to L1 keys are broadcast through the shared tier itself: each write
+increments a sequence number and stores the written keys under it. At most
+every ``SYNC_INTERVAL`` seconds a worker reads the sequence and drops the
+keys written since it last looked from its L1, or its whole L1 when it
+cannot tell what changed. A worker therefore serves another worker's
+overwritten value for at most ``SYNC_INTERVAL`` seconds, and any L1 entry
+for at most ``L1_TTL`` seconds. A shared tier without atomic increments
+(files) can give two simultaneous writes the same number; the write whose
+event is overwritten then relies on ``L1_TTL`` alone.
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from server.metrics import record_cache_tier_lookup
+
+SEQUENCE_KEY = "two-tier:sequence"
+EVENT_TTL = 300
+MAX_EVENTS = 1000
+
+_missing = object()
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def event_key(sequence):
+    return f"two-tier:event:{sequence}"
+
+
+class MemoryTier:
+    """
+    The L1 of one cache alias, shared by the threads of a process.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.seen = None
+        self.published = set()
+        self.next_sync = 0.0
+        self.stats = {"l1": [0, 0], "shared": [0, 0], "syncs": 0}
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _missing
+            if entry[0] <= now:
+                del self.entries[key]
+                return _missing
+            self.entries.move_to_end(key)
+            return pickle.loads(entry[1])
+
+    def set(self, key, value, ttl):
+        entry = (time.monotonic() + ttl, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def count(self, tier, hit):
+        with self.lock:
+            self.stats[tier][0 if hit else 1] += 1
+        record_cache_tier_lookup(tier, hit)
+
+
+def get_tier(name, size):
+    with _tiers_lock:
+        if name not in _tiers:
+            _tiers[name] = MemoryTier(size)
+        return _tiers[name]
+
+
+def _reset_after_fork():
+    # Entries and locks copied from the parent (gunicorn --preload) are not
+    # this worker's.
+    global _tiers_lock
+    _tiers_lock = threading.Lock()
+    _tiers.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class TwoTierCache(BaseCache):
+    """
+    A per-process LRU in front of the cache alias ``OPTIONS["SHARED"]``.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._name = location or "default"
+        self._shared_alias = options["SHARED"]
+        self._size = options.get("L1_SIZE", 1000)
+        self._ttl = options.get("L1_TTL", 5)
+        self._sync_interval = options.get("SYNC_INTERVAL", 0.5)
+        self._prefixes = tuple(options.get("L1_KEY_PREFIXES", ()))
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    @property
+    def memory(self):
+        return get_tier(self._name, self._size)
+
+    def cached_in_memory(self, key):
+        return key.startswith(self._prefixes)
+
+    def memory_key(self, key, version):
+        return self.shared.make_key(key, version)
+
+    def memory_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self._ttl
+        return min(self._ttl, timeout)
+
+    def sync(self):
+        """
+        Drop the L1 entries other workers have written since the last sync.
+        """
+        memory = self.memory
+        now = time.monotonic()
+        with memory.lock:
+            if now < memory.next_sync:
+                return
+            memory.next_sync = now + self._sync_interval
+            seen = memory.seen
+        sequence = self.shared.get(SEQUENCE_KEY) or 0
+        if sequence == seen:
+            return
+        if seen is None:
+            # First look; this L1 holds nothing older than the sequence.
+            pass
+        elif sequence < seen or sequence - seen > MAX_EVENTS:
+            memory.clear()
+        else:
+            with memory.lock:
+                numbers = [
+                    number
+                    for number in range(seen + 1, sequence + 1)
+                    if number not in memory.published
+                ]
+            events = self.shared.get_many([event_key(number) for number in numbers])
+            if len(events) < len(numbers):
+                # Expired, or not stored yet by the writer.
+                memory.clear()
+            else:
+                memory.discard([key for event in events.values() for key in event])
+        with memory.lock:
+            memory.seen = sequence
+            memory.published = {
+                number for number in memory.published if number > sequence
+            }
+            memory.stats["syncs"] += 1
+
+    def publish(self, keys):
+        """
+        Tell every worker to drop ``keys`` (already made) from its L1.
+        """
+        if not keys:
+            return
+        shared = self.shared
+        shared.add(SEQUENCE_KEY, 0, None)
+        try:
+            sequence = shared.incr(SEQUENCE_KEY)
+        except ValueError:
+            # Cleared in between; the reset sequence makes everyone clear.
+            return
+        memory = self.memory
+        with memory.lock:
+            # This worker's own L1 is already up to date.
+            memory.published.add(sequence)
+        shared.set(event_key(sequence), list(keys), EVENT_TTL)
+
+    def get(self, key, default=None, version=None):
+        if not self.cached_in_memory(key):
+            return self.shared.get(key, default, version)
+        self.sync()
+        memory = self.memory
+        made_key = self.memory_key(key, version)
+        value = memory.get(made_key)
+        memory.count("l1", value is not _missing)
+        if value is not _missing:
+            return value
+        value = self.shared.get(key, _missing, version)
+        memory.count("shared", value is not _missing)
+        if value is _missing:
+            return default
+        memory.set(made_key, value, self._ttl)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = {}
+        memory = self.memory
+        if any(self.cached_in_memory(key) for key in keys):
+            self.sync()
+        remaining = []
+        for key in keys:
+            if not self.cached_in_memory(key):
+                remaining.append(key)
+                continue
+            value = memory.get(self.memory_key(key, version))
+            memory.count("l1", value is not _missing)
+            if value is _missing:
+                remaining.append(key)
+            else:
+                found[key] = value
+        if remaining:
+            shared_found = self.shared.get_many(remaining, version)
+            for key in remaining:
+                if not self.cached_in_memory(key):
+                    continue
+                memory.count("shared", key in shared_found)
+                if key in shared_found:
+                    memory.set(
+                        self.memory_key(key, version), shared_found[key], self._ttl
+                    )
+            found.update(shared_found)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        self.written([key], version, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        self.written([key for key in data if key not in failed], version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self.written([key], version, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version)
+        self.written([key], version)
+        return value
+
+    def delete(self, key, version=None):
+        deleted = self.shared.delete(key, version)
+        self.written([key], version)
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version)
+        self.written(keys, version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _missing, version) is not _missing
+
+    def clear(self):
+        # Clearing the shared tier resets the sequence, so every worker
+        # clears its L1 on its next sync.
+        self.shared.clear()
+        self.memory.clear()
+
+    def written(self, keys, version, value=_missing, timeout=DEFAULT_TIMEOUT):
+        keys = [key for key in keys if self.cached_in_memory(key)]
+        if not keys:
+            return
+        made_keys = [self.memory_key(key, version) for key in keys]
+        memory = self.memory
+        memory.discard(made_keys)
+        self.publish(made_keys)
+        ttl = self.memory_ttl(timeout)
+        if value is not _missing and len(keys) == 1 and ttl > 0:
+            memory.set(made_keys[0], value, ttl)
+
+    def stats(self):
+        """
+        Hits and misses per tier and the number of syncs that found writes.
+        """
+        memory = self.memory
+        with memory.lock:
+            return {
+                "l1": {
+                    "hits": memory.stats["l1"][0],
+                    "misses": memory.stats["l1"][1],
+                    "size": len(memory.entries),
+                },
+                "shared": {
+                    "hits": memory.stats["shared"][0],
+                    "misses": memory.stats["shared"][1],
+                },
+                "syncs": memory.stats["syncs"],
+            }
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
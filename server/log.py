@@ -0,0 +1,35 @@
+"""
+Log formatting for the structured records of ``server.timing`` and
+``monitoring``.
+"""
+
+import json
+import logging
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Attributes every LogRecord has; anything else was passed in ``extra``.
+RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line with the time, level, logger, message and
+    every ``extra`` field of the record.
+    """
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in RESERVED and not key.startswith("_")
+        )
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, cls=DjangoJSONEncoder, default=str)
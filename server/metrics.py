@@ -0,0 +1,96 @@
+"""
+Prometheus metrics shared by the middleware and the ``/metrics`` endpoint.
+
+When ``PROMETHEUS_MULTIPROC_DIR`` is set (see ``entrypoint.sh``), every
+gunicorn worker writes its samples to memory-mapped files in that directory
+and the endpoint aggregates all of them, so a scrape that lands on any
+worker reports totals for the whole server.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by resolved URL name, method and status code.",
+    ["view", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by resolved URL name and method.",
+    ["view", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled.",
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "Database queries executed by resolved URL name.",
+    ["view"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "http_admission_in_flight",
+    "Requests holding an admission slot, by route class.",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_SHED = Counter(
+    "http_admission_shed_total",
+    "Requests answered with 503 because their route class was full.",
+    ["route_class"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ["cache", "result"],
+)
+
+CACHE_TIER_REQUESTS = Counter(
+    "cache_tier_requests_total",
+    "Two-tier cache lookups by tier (l1 or shared) and result (hit or miss).",
+    ["tier", "result"],
+)
+
+
+def record_cache_lookup(cache, hit):
+    """
+    Count a cache lookup; the hit ratio is ``hit / (hit + miss)``.
+    """
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_cache_tier_lookup(tier, hit):
+    CACHE_TIER_REQUESTS.labels(tier=tier, result="hit" if hit else "miss").inc()
+
+
+def render_metrics():
+    """
+    Return the exposition text and its content type.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """
+    Drop the live gauges of a worker that exited. Called from gunicorn.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
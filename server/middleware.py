@@ -0,0 +1,168 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+
+from server import admission, metrics, probes
+from server.timing import start_timer, stop_timer
+
+timing_logger = logging.getLogger("server.timing")
+
+
+class ProbeMiddleware:
+    """
+    Answer liveness and readiness probes before any other middleware, DRF
+    authentication or rendering runs. Must be first in ``MIDDLEWARE``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.liveness_path = settings.PROBES["LIVENESS_PATH"]
+        self.readiness_path = settings.PROBES["READINESS_PATH"]
+
+    def __call__(self, request):
+        path = request.path_info
+        if path == self.liveness_path:
+            return HttpResponse("ok", content_type="text/plain")
+        if path == self.readiness_path:
+            ready, checks, cached = probes.readiness()
+            return JsonResponse(
+                {
+                    "status": "ok" if ready else "unavailable",
+                    "cached": cached,
+                    "checks": checks,
+                },
+                status=200 if ready else 503,
+            )
+        return self.get_response(request)
+
+
+class ServerTimingMiddleware:
+    """
+    Record time spent in SQL, authentication, serialization and rendering for
+    a request and report it in a ``Server-Timing`` header and a log record.
+
+    Requests are timed when ``SERVER_TIMING["ENABLED"]`` is set, subject to
+    ``SAMPLE_RATE``, or when the trusted header carries ``SERVER_TIMING["TOKEN"]``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_time(self, request):
+        config = settings.SERVER_TIMING
+        token = config.get("TOKEN")
+        if token and request.META.get(config["TRUSTED_HEADER"]) == token:
+            return True
+        if not config.get("ENABLED"):
+            return False
+        return random.random() < config.get("SAMPLE_RATE", 1.0)
+
+    def __call__(self, request):
+        if not self.should_time(request):
+            return self.get_response(request)
+
+        timer, token = start_timer()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timer.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            stop_timer(token)
+
+        response["Server-Timing"] = timer.header()
+        timing_logger.info(
+            "%s %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "timing": timer.as_dict(),
+            },
+        )
+        return response
+
+
+class QueryCounter:
+    """
+    ``connection.execute_wrapper`` hook that only counts queries.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Record request count, latency and database queries per resolved URL name,
+    plus the number of requests in flight, for the ``/metrics`` endpoint.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                response = self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+
+        # Label by URL name rather than path to keep the series count bounded.
+        match = getattr(request, "resolver_match", None)
+        view = match.url_name if match and match.url_name else "unresolved"
+        metrics.REQUESTS.labels(
+            view=view, method=request.method, status=response.status_code
+        ).inc()
+        metrics.REQUEST_LATENCY.labels(view=view, method=request.method).observe(
+            time.perf_counter() - started
+        )
+        if counter.count:
+            metrics.DB_QUERIES.labels(view=view).inc(counter.count)
+        return response
+
+
+class AdmissionMiddleware:
+    """
+    Limit concurrent requests per route class and shed the excess with
+    ``503`` and ``Retry-After``, see ``server.admission``. Place it after
+    ``MetricsMiddleware`` so shed requests are counted there too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.ADMISSION["ENABLED"]:
+            return self.get_response(request)
+        route_class, match = admission.classify(request)
+        # Lets MetricsMiddleware label shed requests with their view.
+        request.resolver_match = match
+        try:
+            with admission.admit(route_class):
+                return self.get_response(request)
+        except admission.Full:
+            return JsonResponse(
+                {"error": admission.BUSY_MESSAGE},
+                status=503,
+                headers={"Retry-After": str(settings.ADMISSION["RETRY_AFTER"])},
+            )
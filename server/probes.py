@@ -0,0 +1,84 @@
+"""
+Readiness checks for ``ProbeMiddleware``.
+
+Checks run on a small dedicated thread pool so a hanging database or cache
+only costs the probe its timeout, and results are reused for
+``PROBES["CACHE_TTL"]`` seconds so frequent probes stay cheap.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="readiness")
+_lock = threading.Lock()
+_in_flight = None
+_last_result = None
+_last_checked = 0.0
+
+
+def check_database():
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    finally:
+        connection.close()
+
+
+def check_cache():
+    cache.set("readiness-probe", "ok", 10)
+    if cache.get("readiness-probe") != "ok":
+        raise RuntimeError("Cache did not return the stored value.")
+
+
+CHECKS = {"database": check_database, "cache": check_cache}
+
+
+def run_checks():
+    results = {}
+    for name, check in CHECKS.items():
+        started = time.perf_counter()
+        try:
+            check()
+        except Exception as exc:
+            results[name] = {"ok": False, "error": str(exc)}
+        else:
+            results[name] = {"ok": True}
+        results[name]["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return results
+
+
+def readiness():
+    """
+    Return ``(ready, checks, cached)``, reusing a recent result if possible.
+    """
+    global _in_flight, _last_result, _last_checked
+
+    config = settings.PROBES
+    with _lock:
+        if _last_result and time.monotonic() - _last_checked < config["CACHE_TTL"]:
+            return (*_last_result, True)
+        # Concurrent probes share one run instead of piling up new ones.
+        if _in_flight is None:
+            _in_flight = _executor.submit(run_checks)
+        future = _in_flight
+
+    try:
+        checks = future.result(timeout=config["TIMEOUT"])
+    except FutureTimeoutError:
+        checks = {name: {"ok": False, "error": "timeout"} for name in CHECKS}
+        return False, checks, False
+
+    ready = all(check["ok"] for check in checks.values())
+    with _lock:
+        if _in_flight is future:
+            _in_flight = None
+            _last_result = (ready, checks)
+            _last_checked = time.monotonic()
+    return ready, checks, False
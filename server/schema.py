@@ -0,0 +1,75 @@
+"""
+OpenAPI schema generation for the Swagger UI.
+
+Introspecting every ``@swagger_auto_schema`` view is expensive, so the schema
+is either written to a static file at deploy time (``generate_schema``) or
+built once per process and served with a content-hash ETag.
+"""
+
+import hashlib
+import threading
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views import View
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+API_INFO = openapi.Info(
+    title="API Documentation",
+    default_version="v1",
+    description="API documentation for the server project",
+)
+
+schema_view = get_schema_view(
+    API_INFO,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+_lock = threading.Lock()
+_cached = None
+
+
+def build_schema():
+    """
+    Generate the public schema for all routes as JSON bytes.
+    """
+    generator = schema_view.generator_class(API_INFO)
+    schema = generator.get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def cached_schema():
+    """
+    Return ``(content, etag)``, building the schema on first use.
+    """
+    global _cached
+    if _cached is None:
+        with _lock:
+            if _cached is None:
+                content = build_schema()
+                etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+                _cached = (content, etag)
+    return _cached
+
+
+class CachedSchemaView(View):
+    """
+    Serve the schema built once per process, with ETag revalidation.
+    """
+
+    def get(self, request):
+        content, etag = cached_schema()
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type="application/json")
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, max-age=300"
+        return response
+
+
+swagger_ui_view = schema_view.with_ui("swagger", cache_timeout=0)
+schema_json_view = CachedSchemaView.as_view()
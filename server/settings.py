@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 from django.utils.timezone import timedelta
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
     "whitenoise.runserver_nostatic",
     "django.contrib.staticfiles",
     "blog",
+    "monitoring",
     "rest_framework",
     "rest_framework_simplejwt.token_blacklist",
     "corsheaders",
@@ -51,14 +53,20 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "server.middleware.ProbeMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "server.middleware.MetricsMiddleware",
+    "server.middleware.AdmissionMiddleware",
+    "server.middleware.ServerTimingMiddleware",
+    "monitoring.middleware.SlowQueryMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "monitoring.middleware.ProfilingMiddleware",
 ]
 ROOT_URLCONF = "server.urls"
 SIMPLE_JWT = {
@@ -74,22 +82,214 @@ SIMPLE_JWT = {
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         # "rest_framework.authentication.TokenAuthentication",
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "server.timing.TimedJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "server.timing.TimedJSONRenderer",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
 }
 
+# Per-request phase timing reported in the Server-Timing header.
+# Requests carrying TRUSTED_HEADER with the TOKEN value are always timed.
+SERVER_TIMING = {
+    "ENABLED": os.getenv("SERVER_TIMING_ENABLED", "False") == "True",
+    "SAMPLE_RATE": float(os.getenv("SERVER_TIMING_SAMPLE_RATE", "1.0")),
+    "TRUSTED_HEADER": "HTTP_X_SERVER_TIMING",
+    "TOKEN": os.getenv("SERVER_TIMING_TOKEN"),
+}
+
+# Timing and slow query records are written to the console as JSON lines,
+# with their extra fields.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "server.log.JSONFormatter"},
+    },
+    "handlers": {
+        "json_console": {
+            "class": "logging.StreamHandler",
+            "formatter": "json",
+        },
+    },
+    "loggers": {
+        "server.timing": {
+            "handlers": ["json_console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "monitoring": {
+            "handlers": ["json_console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+# Queries slower than THRESHOLD_MS are logged with their EXPLAIN plan and
+# kept in a ring buffer of BUFFER_SIZE per process and MAX_ROWS in the database.
+SLOW_QUERY = {
+    "ENABLED": os.getenv("SLOW_QUERY_ENABLED", "True") == "True",
+    "THRESHOLD_MS": float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200")),
+    "EXPLAIN": True,
+    "EXPLAIN_ANALYZE": os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "False") == "True",
+    "BUFFER_SIZE": 100,
+    "MAX_ROWS": 1000,
+}
+
+# On-demand request profiling, see monitoring.profiling.
+PROFILING = {
+    "TOKEN_MAX_AGE": int(os.getenv("PROFILING_TOKEN_MAX_AGE", "3600")),
+    "MAX_PROFILES": 200,
+}
+
+# Liveness and readiness probes answered by server.middleware.ProbeMiddleware.
+PROBES = {
+    "LIVENESS_PATH": "/healthz",
+    "READINESS_PATH": "/readyz",
+    "CACHE_TTL": float(os.getenv("READINESS_CACHE_TTL", "2")),
+    "TIMEOUT": float(os.getenv("READINESS_TIMEOUT", "1")),
+}
+
+# Hot/cold archival of posts, see blog.archive.
+ARCHIVE = {
+    "MAX_AGE_DAYS": int(os.getenv("ARCHIVE_MAX_AGE_DAYS", "0")) or None,
+    "BATCH_SIZE": int(os.getenv("ARCHIVE_BATCH_SIZE", "500")),
+}
+
+# Cache of user id to author, see blog.authors.
+AUTHOR_CACHE = {
+    "TTL": float(os.getenv("AUTHOR_CACHE_TTL", "60")),
+}
+
+# Per-author statistics, see blog.author_stats.
+AUTHOR_STATS = {
+    "CACHE_TTL": int(os.getenv("AUTHOR_STATS_CACHE_TTL", "30")),
+}
+
+# Counts of post list pages, see blog.pagination. MODE is "exact" or
+# "estimated".
+POST_LIST_COUNT = {
+    "MODE": os.getenv("POST_LIST_COUNT_MODE", "estimated"),
+    "THRESHOLD": int(os.getenv("POST_LIST_COUNT_THRESHOLD", "10000")),
+    "CACHE_TTL": int(os.getenv("POST_LIST_COUNT_CACHE_TTL", "10")),
+}
+
+# Idempotency-Key handling of create endpoints, see blog.idempotency.
+IDEMPOTENCY = {
+    "TTL": int(os.getenv("IDEMPOTENCY_TTL", "86400")),
+    "LOCK_TIMEOUT": int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "30")),
+    "WAIT": float(os.getenv("IDEMPOTENCY_WAIT", "10")),
+}
+
+# Concurrency limits per route class, see server.admission. Classes not
+# listed here, or with a LIMIT of 0, are not limited.
+ADMISSION = {
+    "ENABLED": os.getenv("ADMISSION_ENABLED", "True") == "True",
+    "LOCK_DIR": os.getenv(
+        "ADMISSION_LOCK_DIR", os.path.join(tempfile.gettempdir(), "blog-admission")
+    ),
+    "RETRY_AFTER": int(os.getenv("ADMISSION_RETRY_AFTER", "1")),
+    "CLASSES": {
+        "search": {
+            "LIMIT": int(os.getenv("ADMISSION_SEARCH_LIMIT", "1")),
+            "QUEUE_TIMEOUT": float(os.getenv("ADMISSION_SEARCH_QUEUE_TIMEOUT", "0.5")),
+        },
+        "read": {
+            "LIMIT": int(os.getenv("ADMISSION_READ_LIMIT", "2")),
+            "QUEUE_TIMEOUT": float(os.getenv("ADMISSION_READ_QUEUE_TIMEOUT", "1")),
+        },
+        "write": {
+            "LIMIT": int(os.getenv("ADMISSION_WRITE_LIMIT", "2")),
+            "QUEUE_TIMEOUT": float(os.getenv("ADMISSION_WRITE_QUEUE_TIMEOUT", "2")),
+        },
+        "auth": {
+            "LIMIT": int(os.getenv("ADMISSION_AUTH_LIMIT", "2")),
+            "QUEUE_TIMEOUT": float(os.getenv("ADMISSION_AUTH_QUEUE_TIMEOUT", "1")),
+        },
+    },
+}
+
+# Password checks on login, see server.auth.passwords.
+AUTHENTICATION_BACKENDS = ["server.auth.passwords.PasswordBackend"]
+PASSWORD_HASHING = {
+    "CONCURRENCY": int(os.getenv("PASSWORD_HASHING_CONCURRENCY", "2")),
+    "QUEUE_DEPTH": int(os.getenv("PASSWORD_HASHING_QUEUE_DEPTH", "2")),
+    "TIMEOUT": float(os.getenv("PASSWORD_HASHING_TIMEOUT", "1")),
+    "RETRY_AFTER": int(os.getenv("PASSWORD_HASHING_RETRY_AFTER", "2")),
+}
+
+# Composite requests to /api/batch/, see server.batch.
+BATCH = {
+    "MAX_REQUESTS": int(os.getenv("BATCH_MAX_REQUESTS", "20")),
+    "MAX_WORKERS": int(os.getenv("BATCH_MAX_WORKERS", "4")),
+    "PATH_PREFIX": "/api/",
+}
+
+# Multi-get of posts by id, /api/blog/posts/batch/.
+POST_BATCH = {
+    "MAX_IDS": int(os.getenv("POST_BATCH_MAX_IDS", "100")),
+    "MAX_COMMENTS": int(os.getenv("POST_BATCH_MAX_COMMENTS", "20")),
+}
+
+# Rendered post details, see blog.detail_cache.
+POST_DETAIL_CACHE = {
+    "ENABLED": os.getenv("POST_DETAIL_CACHE_ENABLED", "True") == "True",
+    "TTL": float(os.getenv("POST_DETAIL_CACHE_TTL", "60")),
+    "STALE_TTL": float(os.getenv("POST_DETAIL_CACHE_STALE_TTL", "300")),
+    "LOCK_TIMEOUT": int(os.getenv("POST_DETAIL_CACHE_LOCK_TIMEOUT", "10")),
+    "WAIT": float(os.getenv("POST_DETAIL_CACHE_WAIT", "2")),
+}
+
+# Change events for downstream consumers, see blog.outbox.
+OUTBOX = {
+    "BATCH_SIZE": int(os.getenv("OUTBOX_BATCH_SIZE", "100")),
+    "SINKS": {
+        "file": {
+            "BACKEND": "blog.outbox.FileSink",
+            "PATH": os.getenv("OUTBOX_FILE_PATH", str(BASE_DIR / "outbox.ndjson")),
+        },
+    },
+}
+if os.getenv("OUTBOX_HTTP_URL"):
+    OUTBOX["SINKS"]["http"] = {
+        "BACKEND": "blog.outbox.HTTPSink",
+        "URL": os.getenv("OUTBOX_HTTP_URL"),
+        "TIMEOUT": float(os.getenv("OUTBOX_HTTP_TIMEOUT", "10")),
+    }
+
+# Live comment stream, see blog.live. The Postgres backend reaches viewers
+# connected to other processes.
+COMMENT_STREAM = {
+    "BACKEND": os.getenv(
+        "COMMENT_STREAM_BACKEND",
+        (
+            "blog.live.PostgresBackend"
+            if os.getenv("USE_POSTGRES", "False") == "True"
+            else "blog.live.LocalBackend"
+        ),
+    ),
+    "HEARTBEAT": float(os.getenv("COMMENT_STREAM_HEARTBEAT", "15")),
+    "RETRY_MS": 3000,
+    "BACKLOG": 100,
+    "QUEUE_SIZE": 100,
+}
+
+# Monthly partitions of the comments table on Postgres, see blog.partitions.
+COMMENT_PARTITIONS = {
+    "MONTHS_AHEAD": int(os.getenv("COMMENT_PARTITION_MONTHS_AHEAD", "3")),
+    "RETENTION_MONTHS": int(os.getenv("COMMENT_RETENTION_MONTHS", "0")) or None,
+}
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": ["template"],
+        "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
@@ -113,9 +313,6 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 
-print(
-    f"Using Postgres: {POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB} as {POSTGRES_USER}"
-)
 if os.getenv("USE_POSTGRES", "False") == "True":
     DATABASES = {
         "default": {
@@ -135,6 +332,66 @@ else:
         }
     }
 
+# The cache shared by all workers: Redis when CACHE_REDIS_URL is set, files
+# otherwise. Each worker reads it through a small in-memory LRU, see
+# server.cache.
+if os.getenv("CACHE_REDIS_URL"):
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_REDIS_URL"),
+    }
+else:
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv(
+            "CACHE_DIR", os.path.join(tempfile.gettempdir(), "blog-cache")
+        ),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+
+CACHES = {
+    "default": {
+        "BACKEND": "server.cache.TwoTierCache",
+        "OPTIONS": {
+            "SHARED": "shared",
+            "L1_SIZE": int(os.getenv("CACHE_L1_SIZE", "1000")),
+            "L1_TTL": float(os.getenv("CACHE_L1_TTL", "5")),
+            "SYNC_INTERVAL": float(os.getenv("CACHE_SYNC_INTERVAL", "0.5")),
+            "L1_KEY_PREFIXES": ["post-detail:", "author:", "author-stats:"],
+        },
+    },
+    "shared": SHARED_CACHE,
+}
+
+# Tests use empty in-memory caches instead, see server.test_runner.
+TEST_RUNNER = "server.test_runner.TestRunner"
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# New passwords use PASSWORD_HASHER; the others stay listed so older hashes
+# still verify and are upgraded on the next login. "argon2" needs the
+# argon2-cffi package.
+
+PASSWORD_HASHER_CLASSES = {
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "scrypt")
+PASSWORD_HASHERS = (
+    [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]]
+    + [
+        path
+        for name, path in PASSWORD_HASHER_CLASSES.items()
+        if name != PASSWORD_HASHER
+    ]
+    + [
+        "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+        "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    ]
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -177,13 +434,37 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
-STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
+
+# Static files get content-hashed names and gzip/Brotli variants at
+# collectstatic time; WhiteNoise serves hashed names with a far-future
+# immutable Cache-Control. Unknown names fall back to the unhashed file.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "server.storage.ImmutableStaticFilesStorage"},
+}
+WHITENOISE_MANIFEST_STRICT = False
+# Pre-rendered pages served at the site root, e.g. the landing page at "/".
+WHITENOISE_ROOT = BASE_DIR / "public"
+WHITENOISE_INDEX_FILE = True
+
+# Where the Swagger UI loads the schema from:
+# "static"  - file written by `manage.py generate_schema`, served by whitenoise
+# "cached"  - built once per worker and served with an ETag
+# "dynamic" - introspected on every request
+OPENAPI_SCHEMA_MODE = os.getenv("OPENAPI_SCHEMA_MODE", "cached")
+OPENAPI_SCHEMA_FILE = os.path.join(STATIC_ROOT, "openapi.json")
+SPEC_URLS = {
+    "static": "/" + STATIC_URL + "openapi.json",
+    "cached": "/swagger.json",
+    "dynamic": None,
+}
 
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {
         "Bearer": {"type": "apiKey", "name": "Authorization", "in": "header"},
     },
     "USE_SESSION_AUTH": False,
+    "SPEC_URL": SPEC_URLS[OPENAPI_SCHEMA_MODE],
 }
 
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
@@ -0,0 +1,44 @@
+"""
+Test runner that keeps the tests off the cache of a running server.
+
+``CACHES`` points at a cache directory or Redis shared by every worker and
+kept between runs. Under test both aliases are in-memory caches instead,
+emptied before every test, so no test sees entries left by another test or
+an earlier run.
+"""
+
+import unittest
+
+from django.core.cache import caches
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    alias: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": f"test-{alias}",
+    }
+    for alias in ("default", "shared")
+}
+
+
+class ClearCachesResult:
+    def startTest(self, test):
+        for cache in caches.all(initialized_only=True):
+            cache.clear()
+        super().startTest(test)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.test_caches = override_settings(CACHES=TEST_CACHES)
+        self.test_caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_caches.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def get_resultclass(self):
+        result_class = super().get_resultclass() or unittest.TextTestResult
+        return type("ClearCachesTestResult", (ClearCachesResult, result_class), {})
@@ -0,0 +1,588 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from blog.models import Author, Comment, Post
+from server import admission, batch
+from server import cache as two_tier
+from server import probes
+from server.auth import passwords
+from server.log import JSONFormatter
+from server.timing import TimedJWTAuthentication
+
+
+class ServerTimingMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        Post.objects.create(
+            title="Test Post",
+            content="This is a test post.",
+            author=self.test_author,
+            status="published",
+            active=True,
+        )
+
+    @override_settings(
+        SERVER_TIMING={
+            "ENABLED": False,
+            "SAMPLE_RATE": 1.0,
+            "TRUSTED_HEADER": "HTTP_X_SERVER_TIMING",
+            "TOKEN": "secret",
+        }
+    )
+    def test_timing_disabled_without_trusted_header(self):
+        """Test that no Server-Timing header is sent when timing is off."""
+        response = self.client.get(reverse("post-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(
+        SERVER_TIMING={
+            "ENABLED": False,
+            "SAMPLE_RATE": 1.0,
+            "TRUSTED_HEADER": "HTTP_X_SERVER_TIMING",
+            "TOKEN": "secret",
+        }
+    )
+    def test_timing_enabled_by_trusted_header(self):
+        """Test that the trusted header turns on timing for one request."""
+        with self.assertLogs("server.timing", level="INFO") as logs:
+            response = self.client.get(
+                reverse("post-list"), HTTP_X_SERVER_TIMING="secret"
+            )
+        self.assertEqual(response.status_code, 200)
+        header = response["Server-Timing"]
+        queries = logs.records[0].timing["db_queries"]
+        self.assertGreater(queries, 0)
+        self.assertIn(f'desc="{queries} queries"', header)
+        for phase in ("db;", "serialize;", "render;", "total;"):
+            self.assertIn(phase, header)
+
+        line = json.loads(JSONFormatter().format(logs.records[0]))
+        self.assertEqual(line["logger"], "server.timing")
+        self.assertEqual(line["status"], 200)
+        self.assertEqual(line["timing"]["db_queries"], queries)
+
+    @override_settings(
+        SERVER_TIMING={
+            "ENABLED": True,
+            "SAMPLE_RATE": 1.0,
+            "TRUSTED_HEADER": "HTTP_X_SERVER_TIMING",
+            "TOKEN": None,
+        }
+    )
+    def test_timing_records_authentication(self):
+        """Test that JWT authentication time is reported when enabled."""
+        with self.assertLogs("server.timing", level="INFO") as logs:
+            response = self.client.post(
+                reverse("login"),
+                {"username": "testuser", "password": "testpassword"},
+                format="json",
+            )
+            self.client.credentials(
+                HTTP_AUTHORIZATION=f"Bearer {response.data['accessToken']}"
+            )
+            response = self.client.get(reverse("post-list"))
+        self.assertIn("auth;", response["Server-Timing"])
+        login, listing = logs.records
+        self.assertEqual(login.path, reverse("login"))
+        self.assertEqual(listing.status, 200)
+        self.assertIn("auth", listing.timing)
+        self.assertGreater(listing.timing["db_queries"], 0)
+
+
+class MetricsEndpointTests(APITestCase):
+    def test_metrics_report_requests_per_url_name(self):
+        """Test that requests are counted under their resolved URL name."""
+        self.client.get(reverse("post-list"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",view="post-list"}', body
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{le="0.005",method="GET",view="post-list"}',
+            body,
+        )
+        self.assertIn('db_queries_total{view="post-list"}', body)
+        self.assertIn("http_requests_in_flight", body)
+
+
+class ProbeTests(APITestCase):
+    def setUp(self):
+        probes._last_result = None
+
+    def test_liveness_short_circuits(self):
+        """Test that the liveness probe answers without touching the database."""
+        with self.assertNumQueries(0):
+            response = self.client.get("/healthz", HTTP_HOST="10.0.0.1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"ok")
+
+    def test_readiness_reports_checks_and_caches(self):
+        """Test that readiness measures database and cache and reuses results."""
+        response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["status"], "ok")
+        self.assertFalse(data["cached"])
+        self.assertTrue(data["checks"]["database"]["ok"])
+        self.assertIn("latency_ms", data["checks"]["cache"])
+        self.assertTrue(self.client.get("/readyz").json()["cached"])
+
+    def test_readiness_fails_when_a_check_fails(self):
+        """Test that a failing check makes the server unready."""
+
+        def broken():
+            raise RuntimeError("down")
+
+        with mock.patch.dict(probes.CHECKS, {"cache": broken}):
+            response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["checks"]["cache"]["error"], "down")
+
+
+class TwoTierCacheTests(APITestCase):
+    def setUp(self):
+        two_tier._tiers.clear()
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        caches = override_settings(
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                "shared": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": location,
+                },
+            }
+        )
+        caches.enable()
+        self.addCleanup(caches.disable)
+        # Two workers of one server.
+        self.first = self.worker("first")
+        self.second = self.worker("second")
+
+    def worker(self, name, **options):
+        options = {
+            "SHARED": "shared",
+            "L1_SIZE": 10,
+            "L1_TTL": 60,
+            "SYNC_INTERVAL": 0,
+            "L1_KEY_PREFIXES": ["post-detail:"],
+            **options,
+        }
+        return two_tier.TwoTierCache(name, {"OPTIONS": options})
+
+    def test_hot_keys_are_served_from_memory(self):
+        """Test that prefixed keys are read from L1 and others from the shared tier."""
+        self.first.set("post-detail:1", {"title": "Post"})
+        self.first.set("post-detail-lock:1", True)
+        self.assertEqual(self.first.get("post-detail:1"), {"title": "Post"})
+        self.assertTrue(self.first.get("post-detail-lock:1"))
+        self.assertEqual(self.second.get("post-detail:1"), {"title": "Post"})
+        self.assertEqual(self.second.get("post-detail:1"), {"title": "Post"})
+
+        first, second = self.first.stats(), self.second.stats()
+        self.assertEqual(first["l1"], {"hits": 1, "misses": 0, "size": 1})
+        self.assertEqual(first["shared"], {"hits": 0, "misses": 0})
+        self.assertEqual(second["l1"], {"hits": 1, "misses": 1, "size": 1})
+        self.assertEqual(second["shared"], {"hits": 1, "misses": 0})
+
+    def test_writes_are_broadcast_to_other_workers(self):
+        """Test that a write or delete in one worker drops the key everywhere."""
+        self.first.set("post-detail:1", "old")
+        self.assertEqual(self.second.get("post-detail:1"), "old")
+        self.first.set("post-detail:1", "new")
+        self.assertEqual(self.second.get("post-detail:1"), "new")
+        self.first.delete_many(["post-detail:1"])
+        self.assertIsNone(self.second.get("post-detail:1"))
+        self.assertEqual(self.first.stats()["l1"]["hits"], 0)
+
+        self.second.set("post-detail:2", "kept")
+        self.assertEqual(self.first.get("post-detail:2"), "kept")
+        self.first.clear()
+        self.assertIsNone(self.second.get("post-detail:2"))
+
+    def test_memory_tier_is_bounded(self):
+        """Test that L1 keeps only the most recently used entries."""
+        worker = self.worker("small", L1_SIZE=2)
+        for number in range(3):
+            worker.set(f"post-detail:{number}", number)
+        self.assertEqual(worker.stats()["l1"]["size"], 2)
+        self.assertEqual(worker.get("post-detail:0"), 0)
+        self.assertEqual(worker.stats()["shared"]["hits"], 1)
+
+
+class BatchTests(APITestCase):
+    def setUp(self):
+        self.test_user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+        self.test_author = Author.objects.create(
+            name="Test Author", email="testuser@example.com", user=self.test_user
+        )
+        self.post = Post.objects.create(
+            title="Test Post",
+            content="This is a test post.",
+            author=self.test_author,
+            status="published",
+            active=True,
+        )
+        response = self.client.post(
+            reverse("login"),
+            {"username": "testuser", "password": "testpassword"},
+            format="json",
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.data['accessToken']}"
+        )
+
+    def test_batch_dispatches_with_the_callers_user(self):
+        """Test that sub-requests run in order, authenticated once as the caller."""
+        old = Comment.objects.create(post=self.post, content="Old comment")
+        requests = [
+            {"path": "/api/blog/posts/?page_size=5"},
+            {
+                "method": "POST",
+                "path": f"/api/blog/posts/{self.post.id}/comments/",
+                "body": {"content": "Batched comment"},
+            },
+            {
+                "method": "DELETE",
+                "path": f"/api/blog/posts/{self.post.id}/comments/{old.id}/",
+            },
+            {"path": f"/api/blog/posts/{self.post.id}/"},
+            {"path": "/api/blog/posts/999/"},
+        ]
+        with mock.patch(
+            "server.timing.TimedJWTAuthentication.authenticate",
+            autospec=True,
+            side_effect=TimedJWTAuthentication.authenticate,
+        ) as authenticate:
+            response = self.client.post(
+                reverse("batch"), {"requests": requests}, format="json"
+            )
+        self.assertEqual(authenticate.call_count, 1)
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [200, 201, 204, 200, 404]
+        )
+        self.assertEqual(results[0]["body"]["count"], 1)
+        self.assertEqual(results[1]["body"]["user"], "testuser")
+        self.assertEqual(results[3]["headers"]["ETag"], '"1"')
+        self.assertEqual(
+            [comment["content"] for comment in results[3]["body"]["comments"]],
+            ["Batched comment"],
+        )
+
+    def test_concurrent_reads_use_the_pool(self):
+        """Test that consecutive reads run on pool threads, writes in order."""
+        threads = []
+        run = batch.run
+
+        def record(request):
+            threads.append((request.method, threading.current_thread().name))
+            return run(request)
+
+        requests = [
+            {"path": "/api/health-check/"},
+            {"path": "/api/health-check/"},
+            {"method": "POST", "path": "/api/health-check/"},
+        ]
+        with mock.patch.object(batch, "run", side_effect=record):
+            response = self.client.post(
+                reverse("batch"),
+                {"requests": requests, "concurrent": True},
+                format="json",
+            )
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]], [200, 200, 405]
+        )
+        self.assertTrue(
+            all(name.startswith("batch") for method, name in threads if method == "GET")
+        )
+        self.assertFalse(threads[-1][1].startswith("batch"))
+
+    def test_invalid_batches_are_rejected(self):
+        """Test that malformed batches get 400 and unbatchable items fail alone."""
+        for body in [
+            {},
+            {"requests": []},
+            {"requests": [{"path": "/admin/"}]},
+            {"requests": [{"path": "/api/health-check/"}] * 21},
+        ]:
+            response = self.client.post(reverse("batch"), body, format="json")
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            reverse("batch"),
+            {
+                "requests": [
+                    {"method": "POST", "path": "/api/batch/", "body": {}},
+                    {"path": f"/api/blog/posts/{self.post.id}/comments/stream/"},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]], [400, 400]
+        )
+
+
+class AdmissionTests(APITestCase):
+    def setUp(self):
+        lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_dir)
+        override = override_settings(
+            ADMISSION={
+                "ENABLED": True,
+                "LOCK_DIR": lock_dir,
+                "RETRY_AFTER": 7,
+                "CLASSES": {
+                    "search": {"LIMIT": 1, "QUEUE_TIMEOUT": 0},
+                    "read": {"LIMIT": 1, "QUEUE_TIMEOUT": 0},
+                },
+            }
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def hold(self, route_class):
+        slot = admission.acquire(route_class, 1, 0)
+        self.assertIsNotNone(slot)
+        self.addCleanup(admission.release, slot)
+
+    def test_requests_are_classified_by_route(self):
+        """Test that requests fall into the route class of their view."""
+        cases = [
+            ("get", reverse("post-list"), {}, "read"),
+            ("get", reverse("post-list"), {"content": "x"}, "search"),
+            ("get", reverse("post-detail", args=[1]), {}, "read"),
+            ("post", reverse("post-batch"), {}, "read"),
+            ("post", reverse("post-list"), {}, "write"),
+            ("post", reverse("login"), {}, "auth"),
+            ("post", reverse("batch"), {}, "default"),
+            ("get", reverse("health_check"), {}, "default"),
+            ("get", "/no-such-page/", {}, "default"),
+        ]
+        factory = RequestFactory()
+        for method, path, params, expected in cases:
+            request = getattr(factory, method)(path, params)
+            self.assertEqual(admission.classify(request)[0], expected, path)
+
+    def test_full_route_class_is_shed(self):
+        """Test that a request whose class is full gets 503 with Retry-After."""
+        self.hold("search")
+        response = self.client.get(reverse("post-list"), {"content": "x"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "7")
+
+        # Other classes are not affected.
+        self.assertEqual(self.client.get(reverse("post-list")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("health_check")).status_code, 200)
+
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('http_admission_shed_total{route_class="search"}', body)
+        self.assertIn('http_admission_in_flight{route_class="read"}', body)
+
+    def test_batched_requests_are_admitted_per_class(self):
+        """Test that a batched search is shed while the search class is full."""
+        self.hold("search")
+        response = self.client.post(
+            reverse("batch"),
+            {
+                "requests": [
+                    {"path": reverse("post-list") + "?content=x"},
+                    {"path": reverse("post-list")},
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        search, read = response.data["results"]
+        self.assertEqual(search["status"], 503)
+        self.assertEqual(search["headers"]["Retry-After"], "7")
+        self.assertEqual(read["status"], 200)
+
+    def test_slot_is_released_after_the_response(self):
+        """Test that a finished request frees its slot for the next one."""
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse("post-list")).status_code, 200)
+        self.hold("read")
+
+
+class PasswordHashingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="testpassword"
+        )
+
+    def login(self, password="testpassword"):
+        return self.client.post(
+            reverse("login"),
+            {"username": "testuser", "password": password},
+            format="json",
+        )
+
+    def test_login_is_shed_when_hashing_slots_are_taken(self):
+        """Test that logins get 503 with Retry-After once every slot is busy."""
+        config = {"CONCURRENCY": 1, "QUEUE_DEPTH": 1, "TIMEOUT": 0, "RETRY_AFTER": 3}
+        lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_dir)
+        admission_config = {**settings.ADMISSION, "LOCK_DIR": lock_dir}
+        with override_settings(PASSWORD_HASHING=config, ADMISSION=admission_config):
+            # As if another worker were hashing.
+            slot = admission.acquire(passwords.HASHING_SLOTS, 1, 0)
+            response = self.login()
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "3")
+
+            place = admission.acquire(passwords.QUEUE_SLOTS, 1, 0)
+            self.assertEqual(self.login().status_code, 503)
+            admission.release(place)
+
+            admission.release(slot)
+            self.assertEqual(self.login().status_code, 200)
+
+    def test_wrong_and_unknown_credentials_are_rejected(self):
+        """Test that a wrong password and an unknown user both get 401."""
+        self.assertEqual(self.login("wrongpassword").status_code, 401)
+        response = self.client.post(
+            reverse("login"),
+            {"username": "nobody", "password": "testpassword"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_goes_through_django_authenticate(self):
+        """Test that failed logins send user_login_failed via the backend."""
+        self.assertEqual(
+            settings.AUTHENTICATION_BACKENDS, ["server.auth.passwords.PasswordBackend"]
+        )
+        failures = []
+
+        def receiver(sender, credentials, **kwargs):
+            failures.append(credentials["username"])
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.assertEqual(self.login("wrongpassword").status_code, 401)
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(failures, ["testuser"])
+
+    def test_login_upgrades_older_password_hash(self):
+        """Test that a PBKDF2 hash is replaced with the preferred hasher."""
+        with override_settings(
+            PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2PasswordHasher"]
+        ):
+            self.user.set_password("testpassword")
+            self.user.save()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+        with override_settings(
+            PASSWORD_HASHERS=[
+                "django.contrib.auth.hashers.ScryptPasswordHasher",
+                "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+            ]
+        ):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+        self.assertEqual(self.login().status_code, 200)
+
+
+class SchemaTests(APITestCase):
+    def test_cached_schema_with_etag(self):
+        """Test that the schema is served with an ETag and revalidates."""
+        response = self.client.get(reverse("schema-json"))
+        self.assertEqual(response.status_code, 200)
+        schema = json.loads(response.content)
+        self.assertEqual(schema["basePath"], "/api")
+        self.assertIn("/blog/posts/", schema["paths"])
+        etag = response["ETag"]
+
+        response = self.client.get(reverse("schema-json"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_swagger_ui_loads_cached_schema(self):
+        """Test that the Swagger UI points at the precomputed schema."""
+        response = self.client.get(reverse("schema-swagger-ui"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "/swagger.json")
+
+    def test_generate_schema_command(self):
+        """Test that the command writes the schema to a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "openapi.json")
+            call_command("generate_schema", f"--output={output}", stdout=StringIO())
+            with open(output) as schema_file:
+                schema = json.load(schema_file)
+        self.assertIn("/auth/login/", schema["paths"])
+
+
+class StartupTests(APITestCase):
+    def test_benchmark_startup_without_docs(self):
+        """Test that a cold start is measured and does not import drf_yasg views."""
+        out = StringIO()
+        call_command("benchmark_startup", "--runs=1", "--json", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertGreater(report["total_ms"], 0)
+        self.assertGreater(report["rss_mb"], 0)
+        self.assertFalse(report["docs_loaded"])
+
+
+class StaticAssetTests(APITestCase):
+    def test_landing_page_is_served_as_static_file(self):
+        """Test that the landing page at the root is served by WhiteNoise."""
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"API Documentation", b"".join(response.streaming_content))
+        self.assertIn("max-age", response["Cache-Control"])
+
+    def test_collected_assets_are_hashed_compressed_and_immutable(self):
+        """Test that collected assets get hashed names, Brotli and immutable caching."""
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as static_root:
+            with open(os.path.join(source, "site.css"), "w") as css_file:
+                css_file.write("body { color: black; }\n" * 100)
+            with override_settings(
+                STATIC_ROOT=static_root,
+                STATICFILES_DIRS=[source],
+                STATICFILES_FINDERS=[
+                    "django.contrib.staticfiles.finders.FileSystemFinder"
+                ],
+            ):
+                call_command("collectstatic", "--no-input", verbosity=0)
+                url = static("site.css")
+                self.assertRegex(url, r"site\.[0-9a-f]{12}\.css$")
+                self.assertTrue(
+                    os.path.exists(
+                        os.path.join(static_root, url[len("/static/") :] + ".br")
+                    )
+                )
+
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response["Content-Encoding"], "br")
+                self.assertIn("immutable", response["Cache-Control"])
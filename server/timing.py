@@ -0,0 +1,130 @@
+"""
+Per-request phase timing used by ``server.middleware.ServerTimingMiddleware``.
+
+A ``RequestTimer`` is only installed for sampled requests. Every hook below
+checks for it first, so untimed requests pay a single context variable
+lookup per hook.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+_current_timer = ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    """
+    Accumulates time spent per phase, plus database query count and SQL time.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.active = set()
+        self.queries = 0
+        self.sql_time = 0.0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """
+        Hook for ``connection.execute_wrapper`` that counts and times queries.
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - started
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        """
+        Timings in milliseconds, suitable for structured logging.
+        """
+        data = {name: round(value * 1000, 3) for name, value in self.phases.items()}
+        data["db"] = round(self.sql_time * 1000, 3)
+        data["db_queries"] = self.queries
+        data["total"] = round(self.total() * 1000, 3)
+        return data
+
+    def header(self):
+        """
+        Render the timings as a ``Server-Timing`` header value.
+        """
+        entries = [f'db;dur={self.sql_time * 1000:.3f};desc="{self.queries} queries"']
+        for name, value in self.phases.items():
+            entries.append(f"{name};dur={value * 1000:.3f}")
+        entries.append(f"total;dur={self.total() * 1000:.3f}")
+        return ", ".join(entries)
+
+
+def current_timer():
+    return _current_timer.get()
+
+
+def start_timer():
+    """
+    Install a new timer for the current request and return it with the token
+    needed to remove it again.
+    """
+    timer = RequestTimer()
+    return timer, _current_timer.set(timer)
+
+
+def stop_timer(token):
+    _current_timer.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent inside the block to phase ``name``. Nested blocks of
+    the same phase, e.g. nested serializers, are only counted once.
+    """
+    timer = _current_timer.get()
+    if timer is None or name in timer.active:
+        yield
+        return
+    timer.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.phases[name] += time.perf_counter() - started
+        timer.active.discard(name)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin that records time spent in ``to_representation``.
+    """
+
+    def to_representation(self, instance):
+        with timed("serialize"):
+            return super().to_representation(instance)
+
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that records time spent authenticating.
+    """
+
+    def authenticate(self, request):
+        with timed("auth"):
+            return super().authenticate(request)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    JSON renderer that records time spent rendering the response body.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed("render"):
+            return super().render(data, accepted_media_type, renderer_context)